@@ -11,35 +11,96 @@ Key design:
 - Stock validity checks (lethal / homozygous balancer) are centralized here.
 """
 
-from typing import List, Tuple, Dict
-from drosophila_cross_generator import InternalGenotype, Sex
+from collections import Counter
+from functools import lru_cache
+from itertools import product
+from typing import Dict, Iterator, List, Tuple
+from drosophila_cross_generator import InternalGenotype, GenotypeKey, Sex, CHROMOSOME_ORDER
 
 # Lethality markers: genotype is lethal only if SAME marker appears in both alleles of same chromosome.
-LETHALITY_MARKERS = {"Sp", "CyO", "TM6B", "TM3", "MKRS", "Pin"}
+LETHALITY_MARKERS = frozenset({"Sp", "CyO", "TM6B", "TM3", "MKRS", "Pin"})
 
 # Balancer markers (for suppressing recombination on autosomes in females)
 # NOTE: include MKRS if you treat it as a balancer (many labs do).
 # NOTE: "TM6" catches both "TM6B" and "TM6,Tb" variants (substring match)
-BALANCER_MARKERS = {"FM7", "CyO", "TM6B", "TM3", "MKRS", "TM6"}
+BALANCER_MARKERS = frozenset({"FM7", "CyO", "TM6B", "TM3", "MKRS", "TM6"})
+
+# Every marker once, with its lethality bit and balancer bit (0 if not in that set).
+# "Same marker on both alleles" then becomes mask_a1 & mask_a2.
+_LETHALITY_BITS = {marker: 1 << i for i, marker in enumerate(sorted(LETHALITY_MARKERS))}
+_BALANCER_BITS = {marker: 1 << i for i, marker in enumerate(sorted(BALANCER_MARKERS))}
+_MARKER_BITS = tuple(
+    (marker, _LETHALITY_BITS.get(marker, 0), _BALANCER_BITS.get(marker, 0))
+    for marker in sorted(LETHALITY_MARKERS | BALANCER_MARKERS)
+)
+_LETHALITY_MASK_WIDTH = len(LETHALITY_MARKERS)
 
 
 # -----------------------------------------------------------------------------
 # Viability and balancer helpers
 # -----------------------------------------------------------------------------
 
+@lru_cache(maxsize=None)
+def _allele_masks(allele: str) -> Tuple[int, int]:
+    """
+    (lethality_mask, balancer_mask) for an allele, from one pass over all markers
+    (substring match). Cached per allele string: the same few alleles recur in every cross.
+    """
+    # Plain substring tests on purpose: markers overlap ("TM6" inside "TM6B") and the result is
+    # cached, so each distinct allele is scanned only once per process.
+    lethal = balancer = 0
+    for marker, lethal_bit, balancer_bit in _MARKER_BITS:
+        if marker in allele:
+            lethal |= lethal_bit
+            balancer |= balancer_bit
+    return lethal, balancer
+
+
+def _lethality_mask(allele: str) -> int:
+    return _allele_masks(allele)[0]
+
+
+def _balancer_mask(allele: str) -> int:
+    return _allele_masks(allele)[1]
+
+
+@lru_cache(maxsize=None)
+def _packed_lethality_mask(gamete: Tuple[str, ...]) -> int:
+    """
+    Lethality masks of a gamete's alleles packed into one int, one field per chromosome.
+    Two gametes give a lethal child iff their packed masks share a bit.
+    """
+    packed = 0
+    for i, allele in enumerate(gamete):
+        packed |= _lethality_mask(allele) << (_LETHALITY_MASK_WIDTH * i)
+    return packed
+
+
 def is_lethal(genotype: InternalGenotype) -> bool:
-    for chrom, alleles in genotype.items():
-        if not isinstance(alleles, tuple) or len(alleles) != 2:
-            continue
-        a1, a2 = alleles
-        for marker in LETHALITY_MARKERS:
-            if (marker in a1) and (marker in a2):
-                return True
+    # Lethality depends only on the allele pairs, so their tuple is the cache key
+    return _is_lethal_pairs(tuple(genotype.values()))
+
+
+@lru_cache(maxsize=8192)
+def _is_lethal_pairs(allele_pairs: Tuple[Tuple[str, str], ...]) -> bool:
+    for a1, a2 in allele_pairs:
+        if _lethality_mask(a1) & _lethality_mask(a2):
+            return True
     return False
 
 
+def is_lethal_key(key: GenotypeKey) -> bool:
+    """is_lethal() for a genotype already in GenotypeKey form (shares its cache)."""
+    return _is_lethal_pairs(tuple(pair for _, pair in key))
+
+
 def has_balancer(allele: str) -> bool:
-    return any(marker in allele for marker in BALANCER_MARKERS)
+    return _balancer_mask(allele) != 0
+
+
+def pair_has_balancer(a1: str, a2: str) -> bool:
+    """has_balancer(a1) or has_balancer(a2), as one test on the cached integer masks."""
+    return (_balancer_mask(a1) | _balancer_mask(a2)) != 0
 
 
 # -----------------------------------------------------------------------------
@@ -55,14 +116,31 @@ def has_homozygous_balancer(genotype: InternalGenotype) -> bool:
       - 3:MKRS/MKRS -> True
       - 3:TM3/TM6B  -> False
     """
+    for a1, a2 in genotype.values():
+        if _balancer_mask(a1) & _balancer_mask(a2):
+            return True
+    return False
+
+
+@lru_cache(maxsize=8192)
+def has_homozygous_balancer_key(key: GenotypeKey) -> bool:
+    """has_homozygous_balancer() for a genotype already in GenotypeKey form (cached per key)."""
+    for _, (a1, a2) in key:
+        if _balancer_mask(a1) & _balancer_mask(a2):
+            return True
+    return False
+
+
+def _check_shape(genotype: InternalGenotype, context: str) -> None:
+    """
+    Enforce the InternalGenotype invariant (every chromosome maps to a tuple of 2 alleles).
+    Checked once at validation time so the predicates above can unpack alleles directly.
+    """
     for chrom, alleles in genotype.items():
         if not isinstance(alleles, tuple) or len(alleles) != 2:
-            continue
-        a1, a2 = alleles
-        for marker in BALANCER_MARKERS:
-            if (marker in a1) and (marker in a2):
-                return True
-    return False
+            raise ValueError(
+                f"Invalid {context}: chromosome {chrom} must have a tuple of 2 alleles."
+            )
 
 
 def validate_stock_genotype(genotype: InternalGenotype, context: str = "genotype") -> None:
@@ -70,15 +148,19 @@ def validate_stock_genotype(genotype: InternalGenotype, context: str = "genotype
     Raises ValueError if genotype is invalid as a stock/parent/target.
 
     Enforces:
+    0) Shape: every chromosome has a tuple of 2 alleles
     1) Lethality rule (same lethality marker on both alleles of a chromosome)
     2) Homozygous balancer forbidden (same balancer marker on both alleles)
     """
-    if is_lethal(genotype):
+    _check_shape(genotype, context)
+    key = genotype_to_key(genotype)
+
+    if is_lethal_key(key):
         raise ValueError(
             f"Invalid {context}: genotype is lethal (same lethality marker on both alleles of a chromosome)."
         )
 
-    if has_homozygous_balancer(genotype):
+    if has_homozygous_balancer_key(key):
         raise ValueError(
             f"Invalid {context}: genotype has a homozygous balancer (same balancer on both alleles, e.g. CyO/CyO)."
         )
@@ -96,79 +178,113 @@ def get_gametes(parent_genotype: InternalGenotype, role: Sex) -> List[Dict[str,
     - We do not model loci within chromosomes -> no recombinant haplotypes generated.
     - Role only changes recombination conceptually, but output set is the same here.
     """
-    gametes: List[Dict[str, str]] = [{}]
-    chromosome_order = sorted(parent_genotype.keys(), key=lambda c: (c != "X", c))
+    chroms, gametes = _gamete_table(genotype_to_key(parent_genotype), role)
+    return [dict(zip(chroms, g)) for g in gametes]
+
+
+@lru_cache(maxsize=None)
+def _gamete_table(parent_key: Tuple, role: Sex) -> Tuple[Tuple[str, ...], Tuple[Tuple[str, ...], ...]]:
+    """
+    Cached gamete enumeration keyed on genotype_to_key(parent) and role.
 
-    for chrom in chromosome_order:
-        allele1, allele2 = parent_genotype[chrom]
-        new_gametes: List[Dict[str, str]] = []
+    Returns (chroms, gametes): the chromosome order once, and each gamete as a tuple
+    of alleles aligned with it. Homozygous chromosomes contribute a single choice, so
+    the product only branches on heterozygous chromosomes.
+    """
+    chroms = tuple(chrom for chrom, _ in parent_key)
 
-        # For our simplified model, both roles output allele1 and allele2 if heterozygous.
-        for g in gametes:
-            g1 = dict(g)
-            g1[chrom] = allele1
-            new_gametes.append(g1)
+    # For our simplified model, both roles output allele1 and allele2 if heterozygous.
+    choices = []
+    for _, (allele1, allele2) in parent_key:
+        choices.append((allele1,) if allele1 == allele2 else (allele1, allele2))
 
-            if allele2 != allele1:
-                g2 = dict(g)
-                g2[chrom] = allele2
-                new_gametes.append(g2)
+    return chroms, tuple(product(*choices))
 
-        gametes = new_gametes
 
-    return gametes
+@lru_cache(maxsize=None)
+def _gamete_lethality_masks(parent_key: GenotypeKey, role: Sex) -> Tuple[int, ...]:
+    """Packed lethality mask of each gamete in _gamete_table(parent_key, role), in the same order."""
+    _, gametes = _gamete_table(parent_key, role)
+    return tuple(_packed_lethality_mask(g) for g in gametes)
 
 
-def cross(parent_f_genotype: InternalGenotype, parent_m_genotype: InternalGenotype) -> List[InternalGenotype]:
+def _iter_offspring_keys(parent_f_genotype: InternalGenotype, parent_m_genotype: InternalGenotype) -> Iterator[GenotypeKey]:
     """
-    Cross using explicit roles: female parent genotype × male parent genotype.
-    Returns ALL viable offspring genotypes (with multiplicity).
+    Yield every viable offspring (with multiplicity) as a ((chrom, (a1, a2)), ...) tuple.
+    Shared by cross() and get_unique_offspring() so counting never builds child dicts.
     """
     if set(parent_f_genotype.keys()) != set(parent_m_genotype.keys()):
         raise ValueError("Parents must have the same chromosome set")
 
-    f_gametes = get_gametes(parent_f_genotype, "F")
-    m_gametes = get_gametes(parent_m_genotype, "M")
+    f_key = genotype_to_key(parent_f_genotype)
+    m_key = genotype_to_key(parent_m_genotype)
+    chroms, f_gametes = _gamete_table(f_key, "F")
+    _, m_gametes = _gamete_table(m_key, "M")
 
-    offspring: List[InternalGenotype] = []
-    for fg in f_gametes:
-        for mg in m_gametes:
-            child: InternalGenotype = {}
-            for chrom in sorted(fg.keys()):
-                child[chrom] = (fg[chrom], mg[chrom])
+    # Lethality is per chromosome, so check it on the gamete masks before building a child.
+    f_masks = _gamete_lethality_masks(f_key, "F")
+    m_masks = _gamete_lethality_masks(m_key, "M")
 
-            if is_lethal(child):
+    for fg, fm in zip(f_gametes, f_masks):
+        for mg, mm in zip(m_gametes, m_masks):
+            if fm & mm:
                 continue
 
-            offspring.append(child)
+            yield tuple(zip(chroms, zip(fg, mg)))
 
-    return offspring
+
+def cross(parent_f_genotype: InternalGenotype, parent_m_genotype: InternalGenotype) -> List[InternalGenotype]:
+    """
+    Cross using explicit roles: female parent genotype × male parent genotype.
+    Returns ALL viable offspring genotypes (with multiplicity).
+    """
+    return [key_to_genotype(k) for k in _iter_offspring_keys(parent_f_genotype, parent_m_genotype)]
 
 
-def genotype_to_key(genotype: InternalGenotype) -> Tuple:
-    return tuple((chrom, tuple(genotype[chrom])) for chrom in sorted(genotype.keys()))
+def cross_counts(parent_f_genotype: InternalGenotype,
+                 parent_m_genotype: InternalGenotype) -> Tuple[Counter, int]:
+    """
+    Same cross as cross(), already deduplicated: returns (Counter[GenotypeKey], total viable).
+    Use this instead of cross() when only the distribution is needed.
+    """
+    counts = Counter(_iter_offspring_keys(parent_f_genotype, parent_m_genotype))
+    return counts, sum(counts.values())
 
 
-def get_unique_offspring(parent_f_genotype: InternalGenotype,
-                         parent_m_genotype: InternalGenotype) -> List[Tuple[InternalGenotype, float]]:
+def genotype_to_key(genotype: InternalGenotype) -> GenotypeKey:
+    key = tuple((chrom, tuple(genotype[chrom])) for chrom in CHROMOSOME_ORDER if chrom in genotype)
+    if len(key) != len(genotype):
+        # Non-standard chromosome names: fall back to a plain sort
+        key = tuple((chrom, tuple(genotype[chrom])) for chrom in sorted(genotype.keys()))
+    return key
+
+
+def key_to_genotype(key: GenotypeKey) -> InternalGenotype:
+    return dict(key)
+
+
+def get_unique_offspring_keys(parent_f_genotype: InternalGenotype,
+                              parent_m_genotype: InternalGenotype) -> List[Tuple[GenotypeKey, float]]:
     """
-    Returns [(genotype, frequency)] sorted by frequency desc.
-    Frequency is count / total viable offspring (after lethality filtering).
+    Same as get_unique_offspring, but each genotype is returned as its GenotypeKey.
+    Lets callers compare/hash offspring without building a dict per genotype.
     """
-    all_offspring = cross(parent_f_genotype, parent_m_genotype)
-    total = len(all_offspring)
+    counts, total = cross_counts(parent_f_genotype, parent_m_genotype)
     if total == 0:
         return []
 
-    counts: Dict[Tuple, int] = {}
-    for g in all_offspring:
-        k = genotype_to_key(g)
-        counts[k] = counts.get(k, 0) + 1
-
-    out: List[Tuple[InternalGenotype, float]] = []
-    for k, c in counts.items():
-        genotype = {chrom: alleles for chrom, alleles in k}
-        out.append((genotype, c / total))
-
+    out: List[Tuple[GenotypeKey, float]] = [(k, c / total) for k, c in counts.items()]
     out.sort(key=lambda x: x[1], reverse=True)
     return out
+
+
+def get_unique_offspring(parent_f_genotype: InternalGenotype,
+                         parent_m_genotype: InternalGenotype) -> List[Tuple[InternalGenotype, float]]:
+    """
+    Returns [(genotype, frequency)] sorted by frequency desc.
+    Frequency is count / total viable offspring (after lethality filtering).
+    """
+    return [
+        (key_to_genotype(k), f)
+        for k, f in get_unique_offspring_keys(parent_f_genotype, parent_m_genotype)
+    ]
@@ -10,6 +10,15 @@ InternalGenotype = Dict[str, Tuple[str, str]]
 """
 Internal genotype format: dictionary mapping chromosome to tuple of two alleles.
 Example: {"X": ("w", "w"), "2": ("CyO", "+"), "3": ("TM6B", "+"), "4": ("+", "+")}
+
+Invariant: every value is a tuple of exactly 2 allele strings. Parsers guarantee it and
+validate_stock_genotype checks it, so cross logic unpacks alleles without re-checking.
+"""
+
+GenotypeKey = Tuple[Tuple[str, Tuple[str, str]], ...]
+"""
+Hashable canonical form of an InternalGenotype: ((chrom, (allele1, allele2)), ...) in
+CHROMOSOME_ORDER. Example: (("2", ("CyO", "+")), ("3", ("+", "+")), ("4", ("+", "+")))
 """
 
 Sex = str  # "F" for female, "M" for male
@@ -22,6 +31,9 @@ VALID_CHROMOSOMES = {"2", "3", "4"}
 AUTOSOME_CHROMOSOMES = {"2", "3", "4"}
 """Set of autosome chromosome names (non-sex chromosomes)"""
 
+CHROMOSOME_ORDER = ("2", "3", "4")
+"""Canonical chromosome order, used instead of sorting genotype keys in hot loops"""
+
 # Default genotype template
 DEFAULT_GENOTYPE_TEMPLATE: InternalGenotype = {
     "2": ("+", "+"),
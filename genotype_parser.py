@@ -2,8 +2,16 @@
 Parsing functions to convert between external and internal genotype formats
 """
 
+import re
+import sys
+from functools import lru_cache
 from typing import Dict, Tuple, List
-from drosophila_cross_generator import InternalGenotype, VALID_CHROMOSOMES, AUTOSOME_CHROMOSOMES, Sex
+from drosophila_cross_generator import InternalGenotype, VALID_CHROMOSOMES, AUTOSOME_CHROMOSOMES, CHROMOSOME_ORDER, Sex
+
+# One chromosome entry of the external format: "<chrom>:<allele1>/<allele2>"
+_ENTRY_RE = re.compile(
+    "(" + "|".join(map(re.escape, sorted(VALID_CHROMOSOMES))) + r"):([^/\s]+)/([^/\s]+)"
+)
 
 
 def determine_sex_from_genotype(genotype: InternalGenotype) -> Sex:
@@ -48,6 +56,33 @@ def determine_sex_from_genotype(genotype: InternalGenotype) -> Sex:
     return "F"  # Default, should be overridden by explicit sex tracking
 
 
+def _raise_entry_error(entry: str) -> None:
+    """
+    Raise a ValueError describing why a chromosome entry did not match _ENTRY_RE.
+    Only used on the error path; valid entries are parsed by the regex alone.
+    """
+    # Split by colon to separate chromosome number from alleles
+    if ":" not in entry:
+        raise ValueError(f"Invalid format: {entry}. Expected 'chromosome:allele1/allele2'")
+    
+    chrom, alleles_str = entry.split(":", 1)
+    
+    # Validate chromosome number
+    if chrom not in VALID_CHROMOSOMES:
+        raise ValueError(f"Invalid chromosome: {chrom}. Must be one of {VALID_CHROMOSOMES}")
+    
+    # Autosomes: always diploid
+    if "/" not in alleles_str:
+        raise ValueError(f"Invalid allele format in {entry}. Expected 'allele1/allele2'")
+    
+    alleles = alleles_str.split("/")
+    if len(alleles) != 2:
+        raise ValueError(f"Invalid allele format in {entry}. Expected exactly 2 alleles")
+    
+    # Validate alleles are not empty
+    raise ValueError(f"Empty allele in {entry}")
+
+
 def external_to_internal(external_genotype: str) -> Tuple[InternalGenotype, Sex]:
     """
     Convert external format to internal format.
@@ -67,40 +102,34 @@ def external_to_internal(external_genotype: str) -> Tuple[InternalGenotype, Sex]
     Raises:
         ValueError: If format is invalid
     """
-    internal: InternalGenotype = {}
+    entries, sex = _parse_external(external_genotype)
+    # Fresh dict per call: the cached parse is shared, callers may mutate their copy
+    return dict(entries), sex
+
+
+@lru_cache(maxsize=512)
+def _parse_external(external_genotype: str) -> Tuple[Tuple[Tuple[str, Tuple[str, str]], ...], Sex]:
+    """
+    Parse external_genotype into ((chrom, (allele1, allele2)), ...) in input order.
+    Cached per string: the GUI re-parses the same parents/target on every run.
+    """
+    entries: List[Tuple[str, Tuple[str, str]]] = []
     sex: Sex = "F"  # Default to female (will be overridden by database)
     
     # Split by whitespace to get individual chromosome entries
     chromosome_entries = external_genotype.strip().split()
     
     for entry in chromosome_entries:
-        # Split by colon to separate chromosome number from alleles
-        if ":" not in entry:
-            raise ValueError(f"Invalid format: {entry}. Expected 'chromosome:allele1/allele2'")
-        
-        chrom, alleles_str = entry.split(":", 1)
+        match = _ENTRY_RE.fullmatch(entry)
+        if match is None:
+            _raise_entry_error(entry)
         
-        # Validate chromosome number
-        if chrom not in VALID_CHROMOSOMES:
-            raise ValueError(f"Invalid chromosome: {chrom}. Must be one of {VALID_CHROMOSOMES}")
+        chrom, allele1, allele2 = match.groups()
         
-        # Autosomes: always diploid
-        if "/" not in alleles_str:
-            raise ValueError(f"Invalid allele format in {entry}. Expected 'allele1/allele2'")
-        
-        alleles = alleles_str.split("/")
-        if len(alleles) != 2:
-            raise ValueError(f"Invalid allele format in {entry}. Expected exactly 2 alleles")
-        
-        allele1, allele2 = alleles
-        
-        # Validate alleles are not empty
-        if not allele1 or not allele2:
-            raise ValueError(f"Empty allele in {entry}")
-        
-        internal[chrom] = (allele1, allele2)
+        # Intern so repeated alleles share one object (cheap hashing/equality in cross logic)
+        entries.append((sys.intern(chrom), (sys.intern(allele1), sys.intern(allele2))))
     
-    return internal, sex
+    return tuple(entries), sex
 
 
 def internal_to_external(internal_genotype: InternalGenotype, sex: Sex) -> str:
@@ -123,17 +152,31 @@ def internal_to_external(internal_genotype: InternalGenotype, sex: Sex) -> str:
     Raises:
         ValueError: If format is invalid
     """
+    items = tuple(internal_genotype.items())
+    try:
+        return _format_external(items)
+    except TypeError:
+        # Unhashable alleles (e.g. a list): skip the cache so validation reports it
+        return _format_external.__wrapped__(items)
+
+
+@lru_cache(maxsize=4096)
+def _format_external(items: Tuple[Tuple[str, Tuple[str, str]], ...]) -> str:
+    """
+    Format (chrom, (allele1, allele2)) items as an external string.
+    Cached per genotype: the planner and GUI print the same genotypes repeatedly.
+    """
+    internal_genotype = dict(items)
     external_parts = []
     
-    # Sort chromosomes: 2, 3, 4 (no X chromosome)
-    chromosome_order = sorted([c for c in internal_genotype.keys()])
+    for chrom in internal_genotype:
+        if chrom not in VALID_CHROMOSOMES:
+            raise ValueError(f"Invalid chromosome: {chrom}. Must be one of {VALID_CHROMOSOMES}")
     
-    for chrom in chromosome_order:
+    # Canonical order: 2, 3, 4 (no X chromosome)
+    for chrom in CHROMOSOME_ORDER:
         if chrom not in internal_genotype:
             continue
-            
-        if chrom not in VALID_CHROMOSOMES:
-            raise ValueError(f"Invalid chromosome: {chrom}. Must be one of {VALID_CHROMOSOMES}")
         
         alleles = internal_genotype[chrom]
         
@@ -13,16 +13,38 @@ NEW IMPORTANT CHANGE:
   - Planner tab (when running planner)
 """
 
+import threading
 import tkinter as tk
+from concurrent.futures import ThreadPoolExecutor, Future
+from functools import lru_cache
 from tkinter import ttk, messagebox
-from typing import Optional
-import pandas as pd
-from pathlib import Path
+from typing import Dict, Optional, Tuple
 
-from lab_stocks import read_lab_stocks, get_stock_by_name
+from lab_stocks import read_lab_stocks, append_stock_row, get_stock_by_name, LabStocks
 from genotype_parser import external_to_internal, internal_to_external
 from target_planner import plan_to_target, BreedingPlan, allowed_as_female_parent
-from cross_logic import validate_stock_genotype
+from cross_logic import validate_stock_genotype, genotype_to_key, key_to_genotype
+from drosophila_cross_generator import GenotypeKey, CHROMOSOME_ORDER
+
+
+# How often the Tk loop checks whether the planner thread has finished
+PLANNER_POLL_MS = 50
+
+# Combobox selections within this window collapse into one stock-info update
+STOCK_INFO_DEBOUNCE_MS = 100
+
+# Stocks table rows inserted per idle callback (keeps the UI responsive on large labs)
+TREE_INSERT_CHUNK = 500
+
+# Plan text inserted per idle callback into the preview/results Text widgets
+TEXT_PAGE_CHARS = 10_000
+
+
+@lru_cache(maxsize=1024)
+def _genotype_display(key: GenotypeKey) -> Tuple[str, bool]:
+    """(external genotype string, female-role eligible) for a genotype, cached per key."""
+    genotype = key_to_genotype(key)
+    return internal_to_external(genotype, "F"), allowed_as_female_parent(genotype)
 
 
 class TargetPlannerGUI:
@@ -35,15 +57,27 @@ class TargetPlannerGUI:
             self.lab_stocks = read_lab_stocks()
         except FileNotFoundError:
             messagebox.showerror("Error", "lab stocks.xlsx not found!")
-            self.lab_stocks = []
+            self.lab_stocks = LabStocks()
         except Exception as e:
             messagebox.showerror("Error", f"Error reading lab stocks: {e}")
-            self.lab_stocks = []
+            self.lab_stocks = LabStocks()
 
-        self.stock_names = [stock["name"] for stock in self.lab_stocks]
+        # Tuple shared by both comboboxes; replaced (not mutated) when stocks change
+        self.stock_names: Tuple[str, ...] = tuple(stock["name"] for stock in self.lab_stocks)
         self.current_plan: Optional[BreedingPlan] = None
 
+        # plan_to_target runs here so the Tk main loop never blocks on a search
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._cancel_event: Optional[threading.Event] = None
+
+        # Latest _set_text call per Text widget (see _insert_text_page)
+        self._text_tokens: Dict[str, object] = {}
+
+        # Pending debounced _show_stock_info call per combobox (1 / 2)
+        self._show_info_after_ids: Dict[int, str] = {}
+
         self._create_widgets()
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
 
     # ---------------------------------------------------------------------
     # UI
@@ -89,7 +123,7 @@ class TargetPlannerGUI:
         self.stock1_var = tk.StringVar()
         self.stock1_combo = ttk.Combobox(p1_frame, textvariable=self.stock1_var, values=self.stock_names, width=30)
         self.stock1_combo.pack(side=tk.LEFT, fill=tk.X, expand=True)
-        self.stock1_combo.bind("<<ComboboxSelected>>", lambda e: self._show_stock_info(1))
+        self.stock1_combo.bind("<<ComboboxSelected>>", lambda e: self._schedule_stock_info(1))
 
         self.stock1_info = ttk.Label(left_panel, text="", wraplength=300)
         self.stock1_info.pack(anchor=tk.W, pady=(0, 10))
@@ -106,7 +140,7 @@ class TargetPlannerGUI:
         self.stock2_var = tk.StringVar()
         self.stock2_combo = ttk.Combobox(p2_frame, textvariable=self.stock2_var, values=self.stock_names, width=30)
         self.stock2_combo.pack(side=tk.LEFT, fill=tk.X, expand=True)
-        self.stock2_combo.bind("<<ComboboxSelected>>", lambda e: self._show_stock_info(2))
+        self.stock2_combo.bind("<<ComboboxSelected>>", lambda e: self._schedule_stock_info(2))
 
         self.stock2_info = ttk.Label(left_panel, text="", wraplength=300)
         self.stock2_info.pack(anchor=tk.W, pady=(0, 10))
@@ -132,15 +166,21 @@ class TargetPlannerGUI:
 
         self.run_button = ttk.Button(button_frame, text="Run Planner", command=self._run_planner)
         self.run_button.pack(side=tk.LEFT, padx=(0, 5))
+        self.cancel_button = ttk.Button(button_frame, text="Cancel", command=self._cancel_planner, state=tk.DISABLED)
+        self.cancel_button.pack(side=tk.LEFT, padx=(0, 5))
         ttk.Button(button_frame, text="Clear", command=self._clear_inputs).pack(side=tk.LEFT)
 
+        self.progress = ttk.Progressbar(left_panel, mode="indeterminate")
+        self.progress.pack(fill=tk.X, pady=(10, 0))
+
         # Right preview
         right_panel = ttk.Frame(self.planning_frame)
         right_panel.pack(side=tk.RIGHT, fill=tk.BOTH, expand=True, padx=(0, 10), pady=10)
 
         ttk.Label(right_panel, text="Preview & Results", font=("Arial", 12, "bold")).pack(anchor=tk.W, pady=(0, 5))
 
-        self.preview_text = tk.Text(right_panel, height=30, width=60, wrap=tk.WORD)
+        self.preview_text = tk.Text(right_panel, height=30, width=60, wrap=tk.WORD,
+                                    undo=False, maxundo=0, state=tk.DISABLED)
         self.preview_text.pack(fill=tk.BOTH, expand=True)
 
         scrollbar = ttk.Scrollbar(self.preview_text)
@@ -176,6 +216,9 @@ class TargetPlannerGUI:
         list_frame = ttk.LabelFrame(self.stocks_frame, text="Current Stocks", padding=10)
         list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=(0, 10))
 
+        # Added stocks are kept in memory; reload only picks up edits made outside the GUI
+        ttk.Button(list_frame, text="Reload from Disk", command=self._reload_stocks).pack(anchor=tk.E, pady=(0, 5))
+
         columns = ("Name", "Owner", "Genotype", "Notes")
         self.stocks_tree = ttk.Treeview(list_frame, columns=columns, height=15)
         self.stocks_tree.column("#0", width=0, stretch=tk.NO)
@@ -191,7 +234,8 @@ class TargetPlannerGUI:
         self._refresh_stocks_list()
 
     def _create_results_tab(self):
-        self.results_text = tk.Text(self.results_frame, wrap=tk.WORD, font=("Courier", 10))
+        self.results_text = tk.Text(self.results_frame, wrap=tk.WORD, font=("Courier", 10),
+                                    undo=False, maxundo=0, state=tk.DISABLED)
         self.results_text.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
 
         scrollbar = ttk.Scrollbar(self.results_text)
@@ -204,9 +248,30 @@ class TargetPlannerGUI:
     # ---------------------------------------------------------------------
 
     def _role_eligibility_text(self, internal_genotype) -> str:
-        female_ok = allowed_as_female_parent(internal_genotype)
+        _, female_ok = _genotype_display(genotype_to_key(internal_genotype))
         return f"Female-role eligible: {'YES' if female_ok else 'NO'}\nMale-role eligible: YES"
 
+    def _schedule_stock_info(self, which: int):
+        after_id = self._show_info_after_ids.pop(which, None)
+        if after_id is not None:
+            self.root.after_cancel(after_id)
+        self._show_info_after_ids[which] = self.root.after(
+            STOCK_INFO_DEBOUNCE_MS, self._run_scheduled_stock_info, which
+        )
+
+    def _run_scheduled_stock_info(self, which: int):
+        self._show_info_after_ids.pop(which, None)
+        self._show_stock_info(which)
+
+    def _stock_info_text(self, stock) -> str:
+        """Info label text for a stock, formatted on first use and kept on the stock dict."""
+        info_text = stock.get("_info_text")
+        if info_text is None:
+            internal_g = stock["internal_genotype"]
+            info_text = f"Genotype: {stock['genotype']}\n{self._role_eligibility_text(internal_g)}"
+            stock["_info_text"] = info_text
+        return info_text
+
     def _show_stock_info(self, which: int):
         try:
             if which == 1:
@@ -220,9 +285,7 @@ class TargetPlannerGUI:
                 return
 
             stock = get_stock_by_name(self.lab_stocks, stock_name)
-            internal_g = stock["internal_genotype"]
-            info_text = f"Genotype: {stock['genotype']}\n{self._role_eligibility_text(internal_g)}"
-            label.config(text=info_text, foreground="black")
+            label.config(text=self._stock_info_text(stock), foreground="black")
         except Exception:
             label.config(text="", foreground="black")
 
@@ -288,24 +351,48 @@ class TargetPlannerGUI:
 
         selected_stocks = [stock1, stock2]
 
-        try:
-            self.run_button.config(state=tk.DISABLED)
-            self.root.update()
+        self.run_button.config(state=tk.DISABLED)
+        self.cancel_button.config(state=tk.NORMAL)
+        self.progress.start(10)
 
-            self.current_plan = plan_to_target(selected_stocks, target, max_gen)
+        self._cancel_event = cancel_event = threading.Event()
+        future = self._executor.submit(plan_to_target, selected_stocks, target, max_gen, cancel_event)
+        self.root.after(PLANNER_POLL_MS, self._poll_planner, future, cancel_event)
 
-            if self.current_plan:
-                self._display_results()
-                messagebox.showinfo("Success", "Plan found! Check the Results tab.")
-            else:
-                messagebox.showinfo("No Plan", "No breeding plan found within the specified generations.")
-                self.preview_text.delete(1.0, tk.END)
-                self.preview_text.insert(tk.END, "No breeding plan found within the specified generations.")
+    def _poll_planner(self, future: Future, cancel_event: threading.Event):
+        if not future.done():
+            self.root.after(PLANNER_POLL_MS, self._poll_planner, future, cancel_event)
+            return
+
+        self.progress.stop()
+        self.cancel_button.config(state=tk.DISABLED)
+        self.run_button.config(state=tk.NORMAL)
+
+        if cancel_event.is_set():
+            self._set_text(self.preview_text, "Planning cancelled.")
+            return
 
+        try:
+            self.current_plan = future.result()
         except Exception as e:
             messagebox.showerror("Error", f"Error running planner:\n{e}")
-        finally:
-            self.run_button.config(state=tk.NORMAL)
+            return
+
+        if self.current_plan:
+            self._display_results()
+            messagebox.showinfo("Success", "Plan found! Check the Results tab.")
+        else:
+            messagebox.showinfo("No Plan", "No breeding plan found within the specified generations.")
+            self._set_text(self.preview_text, "No breeding plan found within the specified generations.")
+
+    def _cancel_planner(self):
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+
+    def _on_close(self):
+        self._cancel_planner()
+        self._executor.shutdown(wait=False)
+        self.root.destroy()
 
     # ---------------------------------------------------------------------
     # Results display
@@ -315,11 +402,31 @@ class TargetPlannerGUI:
         if not self.current_plan:
             return
         text = self._format_plan(self.current_plan)
-        self.preview_text.delete(1.0, tk.END)
-        self.preview_text.insert(tk.END, text)
-
-        self.results_text.delete(1.0, tk.END)
-        self.results_text.insert(tk.END, text)
+        self._set_text(self.preview_text, text)
+        self._set_text(self.results_text, text)
+
+    def _set_text(self, widget: tk.Text, text: str):
+        """
+        Replace a read-only Text widget's content. The first TEXT_PAGE_CHARS are inserted
+        now, the rest one page per idle callback so long plans never stall the UI.
+        """
+        # A newer _set_text on the same widget supersedes pages still queued from an older one
+        self._text_tokens[str(widget)] = token = object()
+        widget.config(state=tk.NORMAL)
+        widget.delete(1.0, tk.END)
+        widget.config(state=tk.DISABLED)
+        self._insert_text_page(widget, text, 0, token)
+
+    def _insert_text_page(self, widget: tk.Text, text: str, start: int, token):
+        if self._text_tokens.get(str(widget)) is not token:
+            return
+        end = start + TEXT_PAGE_CHARS
+        if text[start:end]:
+            widget.config(state=tk.NORMAL)
+            widget.insert(tk.END, text[start:end])
+            widget.config(state=tk.DISABLED)
+        if end < len(text):
+            self.root.after_idle(self._insert_text_page, widget, text, end, token)
 
     def _format_plan(self, plan: BreedingPlan) -> str:
         lines = [
@@ -331,17 +438,19 @@ class TargetPlannerGUI:
             "-" * 100,
         ]
 
+        tgt, _ = _genotype_display(genotype_to_key(plan.target_genotype))
+
         for i, step in enumerate(plan.steps, 1):
             lines.append(f"\n\nCROSS {i}")
             lines.append("=" * 100)
 
-            p1_gen = internal_to_external(step.parent1_genotype, "F")
-            p2_gen = internal_to_external(step.parent2_genotype, "F")
+            p1_gen, p1_female_ok = _genotype_display(genotype_to_key(step.parent1_genotype))
+            p2_gen, _ = _genotype_display(genotype_to_key(step.parent2_genotype))
 
             lines.append(f"\nParent 1: {step.parent1_name}")
             lines.append("  Role: F (female)")
             lines.append(f"  Genotype: {p1_gen}")
-            lines.append(f"  Female-role eligible: {'YES ✓' if allowed_as_female_parent(step.parent1_genotype) else 'NO ✗'}")
+            lines.append(f"  Female-role eligible: {'YES ✓' if p1_female_ok else 'NO ✗'}")
 
             lines.append(f"\nParent 2: {step.parent2_name}")
             lines.append("  Role: M (male)")
@@ -352,16 +461,15 @@ class TargetPlannerGUI:
             lines.append(f"  {step.parent1_name} (F-role) × {step.parent2_name} (M-role)")
 
             if step.intermediate_genotype:
-                inter = internal_to_external(step.intermediate_genotype, "F")
+                inter, inter_female_ok = _genotype_display(genotype_to_key(step.intermediate_genotype))
                 lines.append(f"\nOFFSPRING (F{step.generation}): multiple genotypes")
                 lines.append("\n▶▶▶ SELECT AS VIRTUAL STOCK FOR NEXT CROSS ◀◀◀")
                 lines.append(f"  Genotype: {inter}")
                 lines.append(f"  Frequency: ~{step.target_probability:.2%}")
                 lines.append(
-                    f"  Female-role eligible later: {'YES' if allowed_as_female_parent(step.intermediate_genotype) else 'NO (male-role only)'}"
+                    f"  Female-role eligible later: {'YES' if inter_female_ok else 'NO (male-role only)'}"
                 )
             else:
-                tgt = internal_to_external(plan.target_genotype, "F")
                 lines.append("\nOFFSPRING (TARGET):")
                 lines.append(f"  Genotype: {tgt}")
                 lines.append(f"  Success Frequency in this cross: ~{step.target_probability:.2%}")
@@ -374,14 +482,41 @@ class TargetPlannerGUI:
     # ---------------------------------------------------------------------
 
     def _refresh_stocks_list(self):
-        for item in self.stocks_tree.get_children():
-            self.stocks_tree.delete(item)
+        children = self.stocks_tree.get_children()
+        if children:
+            self.stocks_tree.delete(*children)
+
+        rows = [(s["name"], s.get("owner", ""), s["genotype"], s.get("notes", "")) for s in self.lab_stocks]
+        # A newer refresh supersedes any chunks still queued from an older one
+        self._tree_refresh_token = token = object()
+        self._insert_tree_rows(rows, 0, token)
+
+    def _insert_tree_rows(self, rows, start: int, token):
+        """Insert rows[start:start + TREE_INSERT_CHUNK], then yield to Tk before the next chunk."""
+        if token is not self._tree_refresh_token:
+            return
+        end = start + TREE_INSERT_CHUNK
+        for values in rows[start:end]:
+            self.stocks_tree.insert("", tk.END, values=values)
+        if end < len(rows):
+            self.root.after_idle(self._insert_tree_rows, rows, end, token)
+
+    def _set_stock_names(self, names: Tuple[str, ...]):
+        if names == self.stock_names:
+            return
+        self.stock_names = names
+        for combo in (self.stock1_combo, self.stock2_combo):
+            combo["values"] = names
 
-        for s in self.lab_stocks:
-            self.stocks_tree.insert(
-                "", tk.END,
-                values=(s["name"], s.get("owner", ""), s["genotype"], s.get("notes", ""))
-            )
+    def _reload_stocks(self):
+        try:
+            self.lab_stocks = read_lab_stocks()
+        except Exception as e:
+            messagebox.showerror("Error", f"Error reading lab stocks: {e}")
+            return
+
+        self._set_stock_names(tuple(stock["name"] for stock in self.lab_stocks))
+        self._refresh_stocks_list()
 
     def _add_new_stock(self):
         name = self.new_stock_name.get().strip()
@@ -405,36 +540,26 @@ class TargetPlannerGUI:
             return
 
         try:
-            excel_path = Path("lab stocks.xlsx")
-            if excel_path.exists():
-                df = pd.read_excel(excel_path)
-            else:
-                df = pd.DataFrame(columns=["stock owner", "stock number", "chromosome 2", "chromosome 3", "chromosome 4", "notes"])
-
-            chrom_data = {}
-            for chrom in ["2", "3", "4"]:
-                if chrom in internal_g:
-                    a1, a2 = internal_g[chrom]
-                    chrom_data[chrom] = f"{a1}/{a2}"
-                else:
-                    chrom_data[chrom] = "+/+"
-
-            new_row = pd.DataFrame([{
-                "stock owner": owner or "lab",
-                "stock number": name,
-                "chromosome 2": chrom_data.get("2", "+/+"),
-                "chromosome 3": chrom_data.get("3", "+/+"),
-                "chromosome 4": chrom_data.get("4", "+/+"),
+            # Missing chromosomes default to wild type, as in the workbook
+            internal_full = {chrom: internal_g.get(chrom, ("+", "+")) for chrom in CHROMOSOME_ORDER}
+            chrom_data = {chrom: f"{a1}/{a2}" for chrom, (a1, a2) in internal_full.items()}
+
+            row = {"stock owner": owner or "lab", "stock number": name}
+            row.update((f"chromosome {chrom}", chrom_data[chrom]) for chrom in CHROMOSOME_ORDER)
+            row["notes"] = notes
+            append_stock_row("lab stocks.xlsx", row)
+
+            # Same shape read_lab_stocks() would produce for the new row (no workbook re-read)
+            new_stock = {
+                "name": name,
+                "genotype": " ".join(f"{chrom}:{data}" for chrom, data in chrom_data.items()),
+                "owner": owner or "lab",
+                "internal_genotype": internal_full,
                 "notes": notes,
-            }])
-
-            df = pd.concat([df, new_row], ignore_index=True)
-            df.to_excel(excel_path, index=False)
-
-            self.lab_stocks = read_lab_stocks()
-            self.stock_names = [stock["name"] for stock in self.lab_stocks]
-            self.stock1_combo["values"] = self.stock_names
-            self.stock2_combo["values"] = self.stock_names
+            }
+            self.lab_stocks.append(new_stock)
+            if name not in self.stock_names:
+                self._set_stock_names(self.stock_names + (name,))
             self._refresh_stocks_list()
 
             self.new_stock_name.delete(0, tk.END)
@@ -455,7 +580,7 @@ class TargetPlannerGUI:
         self.target_var.set("")
         self.stock1_info.config(text="")
         self.stock2_info.config(text="")
-        self.preview_text.delete(1.0, tk.END)
+        self._set_text(self.preview_text, "")
 
 
 def main():
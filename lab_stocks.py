@@ -2,12 +2,27 @@
 Lab stocks data management for reading and accessing available lab stocks
 """
 
-from typing import List, Dict, Tuple
-import pandas as pd
+import hashlib
+import importlib.util
+import json
+import re
+import sys
+from typing import List, Dict, Tuple, Optional, TYPE_CHECKING
 from pathlib import Path
 from genotype_parser import external_to_internal
 from drosophila_cross_generator import InternalGenotype, Sex
 
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Parsed workbooks are cached as JSON in this directory (next to the workbook),
+# keyed by a hash of the workbook bytes. Bump the version when the parsed format changes.
+CACHE_DIR_NAME = ".cache"
+_CACHE_VERSION = 3
+
+# Chromosome column headers (already lowercased), e.g. "chromosome 2", "chromosome_3", "chromosome-x"
+_CHROMOSOME_COL_RE = re.compile(r"chromosome[\s_\-]*([234x])")
+
 
 def read_lab_stocks(file_path: str = "lab stocks.xlsx") -> List[Dict]:
     """
@@ -48,9 +63,15 @@ def read_lab_stocks(file_path: str = "lab stocks.xlsx") -> List[Dict]:
     if not file_path_obj.exists():
         raise FileNotFoundError(f"Lab stocks file not found: {file_path}")
     
+    # Unchanged workbook: skip Excel parsing entirely
+    cache_file = _cache_file_for(file_path_obj)
+    cached = _load_cached_stocks(cache_file)
+    if cached is not None:
+        return LabStocks(cached)
+    
     # Read Excel file
     try:
-        df = pd.read_excel(file_path)
+        df = read_stock_sheet(file_path)
     except Exception as e:
         raise ValueError(f"Error reading Excel file: {e}")
     
@@ -74,39 +95,216 @@ def read_lab_stocks(file_path: str = "lab stocks.xlsx") -> List[Dict]:
     if not lab_stocks:
         raise ValueError("No stocks found in the Excel file")
     
-    return lab_stocks
+    _store_cached_stocks(cache_file, lab_stocks)
+    return LabStocks(lab_stocks)
+
+
+class LabStocks(list):
+    """
+    The list of stock dicts returned by read_lab_stocks, plus a case-insensitive name index
+    so get_stock_by_name() is a dict lookup instead of a scan.
+    
+    Behaves as a plain list. Each list mutator below drops the index and find() rebuilds it
+    on the next lookup; editing a stock dict's 'name' in place is not tracked.
+    """
+    
+    def __init__(self, stocks=()):
+        super().__init__(stocks)
+        self._by_name_ci: Optional[Dict[str, Dict]] = None
+    
+    def find(self, stock_name: str) -> Optional[Dict]:
+        """First stock whose name matches stock_name case-insensitively, or None."""
+        if self._by_name_ci is None:
+            by_name_ci: Dict[str, Dict] = {}
+            for stock in self:
+                by_name_ci.setdefault(stock['name'].lower(), stock)
+            self._by_name_ci = by_name_ci
+        return self._by_name_ci.get(stock_name.lower())
+    
+    # Mutators: same behaviour as list, plus dropping the name index
+    
+    def __setitem__(self, index, value):
+        self._by_name_ci = None
+        super().__setitem__(index, value)
+    
+    def __delitem__(self, index):
+        self._by_name_ci = None
+        super().__delitem__(index)
+    
+    def __iadd__(self, other):
+        self._by_name_ci = None
+        return super().__iadd__(other)
+    
+    def __imul__(self, n):
+        self._by_name_ci = None
+        return super().__imul__(n)
+    
+    def append(self, stock):
+        self._by_name_ci = None
+        super().append(stock)
+    
+    def extend(self, stocks):
+        self._by_name_ci = None
+        super().extend(stocks)
+    
+    def insert(self, index, stock):
+        self._by_name_ci = None
+        super().insert(index, stock)
+    
+    def pop(self, index=-1):
+        self._by_name_ci = None
+        return super().pop(index)
+    
+    def remove(self, stock):
+        self._by_name_ci = None
+        super().remove(stock)
+    
+    def clear(self):
+        self._by_name_ci = None
+        super().clear()
+    
+    def sort(self, *, key=None, reverse=False):
+        self._by_name_ci = None
+        super().sort(key=key, reverse=reverse)
+    
+    def reverse(self):
+        self._by_name_ci = None
+        super().reverse()
+
+
+def read_stock_sheet(file_path) -> "pd.DataFrame":
+    """
+    Read the stocks workbook into a DataFrame.
+
+    Uses the Rust-backed calamine engine when python-calamine is installed (roughly
+    twice as fast as openpyxl for reading) and falls back to pandas' default engine.
+    """
+    # Imported here, not at module level: pandas takes a few hundred ms to import and
+    # is not needed when the workbook cache is warm.
+    import pandas as pd
+
+    if _calamine_available():
+        return pd.read_excel(file_path, engine="calamine")
+    return pd.read_excel(file_path)
+
+
+def _calamine_available() -> bool:
+    """
+    True if python-calamine is installed and pandas knows the "calamine" engine.
+    pandas < 2.2 rejects the engine name with ValueError even when the package exists.
+    """
+    if importlib.util.find_spec("python_calamine") is None:
+        return False
+    import pandas as pd
+    return tuple(int(p) for p in re.findall(r"\d+", pd.__version__)[:2]) >= (2, 2)
+
+
+def append_stock_row(file_path, row: Dict[str, str]) -> None:
+    """
+    Append one stock row to the workbook, creating it (with a header) if missing.
+
+    Only the new row is written: the workbook is opened with openpyxl and saved after
+    ws.append(), instead of reading the whole sheet into pandas and rewriting it.
+    Values are placed by matching row keys to the header case-insensitively; keys with
+    no matching column get a new column at the end of the header.
+    """
+    from openpyxl import Workbook, load_workbook
+
+    file_path_obj = Path(file_path)
+    if file_path_obj.exists():
+        wb = load_workbook(file_path_obj)
+        ws = wb.active
+        header = [str(c.value).strip().lower() if c.value is not None else "" for c in ws[1]]
+    else:
+        wb = Workbook()
+        ws = wb.active
+        header = []
+
+    for col in row:
+        if col.lower() not in header:
+            header.append(col.lower())
+            ws.cell(row=1, column=len(header), value=col)
+
+    values_by_col = {col.lower(): (value if value != "" else None) for col, value in row.items()}
+    ws.append([values_by_col.get(col) for col in header])
+    wb.save(file_path_obj)
+
+
+def _cache_file_for(file_path_obj: Path) -> Path:
+    """Cache location for a workbook: .cache/<workbook stem>-<sha1 of contents>.json"""
+    digest = hashlib.sha1(file_path_obj.read_bytes())
+    digest.update(str(_CACHE_VERSION).encode())
+    return file_path_obj.parent / CACHE_DIR_NAME / f"{file_path_obj.stem}-{digest.hexdigest()}.json"
+
+
+def _load_cached_stocks(cache_file: Path) -> Optional[List[Dict]]:
+    """
+    Return the cached stocks list, or None on a miss or an unreadable/malformed cache entry.
+    JSON only: the cache folder may be shared, so its contents are data, never code.
+    """
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        lab_stocks = []
+        for stock in cached:
+            # JSON has no tuples: rebuild the (allele1, allele2) pairs, interned like the parser's
+            stock["internal_genotype"] = {
+                sys.intern(chrom): (sys.intern(allele1), sys.intern(allele2))
+                for chrom, (allele1, allele2) in stock["internal_genotype"].items()
+            }
+            lab_stocks.append(stock)
+        return lab_stocks
+    except Exception:
+        return None
+
+
+def _store_cached_stocks(cache_file: Path, lab_stocks: List[Dict]) -> None:
+    """
+    Best-effort write of a parsed workbook to the cache; entries for older versions of
+    the same workbook (including pre-JSON .pkl files) are removed so the cache holds one
+    file per workbook.
+    """
+    try:
+        cache_file.parent.mkdir(exist_ok=True)
+        stem = cache_file.name.rsplit("-", 1)[0]
+        for stale in cache_file.parent.glob(f"{stem}-*"):
+            if (stale != cache_file and stale.suffix in (".json", ".pkl")
+                    and stale.name.rsplit("-", 1)[0] == stem):
+                stale.unlink()
+        tmp_file = cache_file.with_suffix(".tmp")
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(lab_stocks, f, ensure_ascii=False)
+        tmp_file.replace(cache_file)
+    except (OSError, TypeError, ValueError):
+        pass
 
 
-def _parse_genotype_format(df: pd.DataFrame, column_names_lower: Dict, lab_stocks: List[Dict]):
+def _find_col(column_names_lower: Dict[str, str], keywords: List[str]) -> Optional[str]:
+    """
+    Original name of the first column whose lowercased header contains a keyword.
+    Keywords are tried in priority order; within one keyword, columns in sheet order.
+    """
+    for keyword in keywords:
+        for col_key, col in column_names_lower.items():
+            if keyword in col_key:
+                return col
+    return None
+
+
+def _parse_genotype_format(df: "pd.DataFrame", column_names_lower: Dict, lab_stocks: List[Dict]):
     """Parse Excel file in genotype format (single genotype column)"""
     # Find columns
     col_mapping = {}
     
-    # Find name column
-    name_keywords = ['name', 'stock_name', 'id', 'stock_id', 'stock number']
-    for keyword in name_keywords:
-        for col_key in column_names_lower:
-            if keyword in col_key:
-                col_mapping['name'] = column_names_lower[col_key]
-                break
-        if 'name' in col_mapping:
-            break
-    
-    # Find genotype column
-    genotype_keywords = ['genotype', 'genotype_external', 'external_genotype']
-    for keyword in genotype_keywords:
-        for col_key in column_names_lower:
-            if keyword in col_key:
-                col_mapping['genotype'] = column_names_lower[col_key]
-                break
-        if 'genotype' in col_mapping:
-            break
-    
-    # Find sex column
-    for col_key in column_names_lower:
-        if 'sex' in col_key:
-            col_mapping['sex'] = column_names_lower[col_key]
-            break
+    keywords_by_field = {
+        'name': ['name', 'stock_name', 'id', 'stock_id', 'stock number'],
+        'genotype': ['genotype', 'genotype_external', 'external_genotype'],
+        'sex': ['sex'],
+    }
+    for field_name, keywords in keywords_by_field.items():
+        col = _find_col(column_names_lower, keywords)
+        if col is not None:
+            col_mapping[field_name] = col
     
     # Validate
     if 'name' not in col_mapping or 'genotype' not in col_mapping:
@@ -114,116 +312,77 @@ def _parse_genotype_format(df: pd.DataFrame, column_names_lower: Dict, lab_stock
             f"Required columns not found. Available: {list(df.columns)}"
         )
     
-    # Parse stocks
-    for idx, row in df.iterrows():
-        try:
-            stock_name = str(row[col_mapping['name']]).strip()
-            genotype_str = str(row[col_mapping['genotype']]).strip()
-            
-            internal_genotype, _ = external_to_internal(genotype_str)
-            
-            owner = str(row.get(col_mapping.get('owner', ''), '')).strip() if 'owner' in col_mapping else ""
-            notes = str(row.get(col_mapping.get('notes', ''), '')).strip() if 'notes' in col_mapping else ""
-            
-            # Create single entry per stock (sex-agnostic)
-            # Gender will be determined dynamically during crossing
-            lab_stocks.append({
-                'name': stock_name,
-                'genotype': genotype_str,
-                'internal_genotype': internal_genotype,
-                'owner': owner,
-                'notes': notes
-            })
-        except Exception as e:
-            raise ValueError(f"Error processing row {idx + 2}: {e}")
+    names = _column_strings(df, col_mapping['name'], na_value='nan')
+    genotypes = _column_strings(df, col_mapping['genotype'], na_value='nan')
+    owners = _column_strings(df, col_mapping['owner'], na_value='nan') if 'owner' in col_mapping else [""] * len(df)
+    notes_values = _column_strings(df, col_mapping['notes'], na_value='nan') if 'notes' in col_mapping else [""] * len(df)
+    
+    # Parse the whole genotype column first (external_to_internal caches repeated strings)
+    internal_genotypes = [_parse_genotype_cell(idx, genotype_str) for idx, genotype_str in zip(df.index, genotypes)]
+    
+    # Create single entry per stock (sex-agnostic)
+    # Gender will be determined dynamically during crossing
+    lab_stocks.extend(
+        {
+            'name': stock_name,
+            'genotype': genotype_str,
+            'internal_genotype': internal_genotype,
+            'owner': owner,
+            'notes': notes
+        }
+        for stock_name, genotype_str, internal_genotype, owner, notes
+        in zip(names, genotypes, internal_genotypes, owners, notes_values)
+    )
 
 
-def _parse_chromosome_format(df: pd.DataFrame, column_names_lower: Dict, lab_stocks: List[Dict]):
+def _parse_genotype_cell(idx, genotype_str: str) -> InternalGenotype:
+    """external_to_internal for one genotype cell, reporting the sheet row on failure"""
+    try:
+        internal_genotype, _ = external_to_internal(genotype_str)
+    except Exception as e:
+        raise ValueError(f"Error processing row {idx + 2}: {e}")
+    return internal_genotype
+
+
+def _parse_chromosome_format(df: "pd.DataFrame", column_names_lower: Dict, lab_stocks: List[Dict]):
     """Parse Excel file in chromosome format (separate columns for each chromosome)"""
     # Find name column
-    name_col = None
-    name_keywords = ['stock number', 'stock_number', 'name', 'stock_name', 'id']
-    for keyword in name_keywords:
-        for col_key in column_names_lower:
-            if keyword in col_key:
-                name_col = column_names_lower[col_key]
-                break
-        if name_col:
-            break
+    name_col = _find_col(column_names_lower, ['stock number', 'stock_number', 'name', 'stock_name', 'id'])
     
     if not name_col:
         raise ValueError(f"Stock name/ID column not found. Available: {list(df.columns)}")
     
-    # Find owner column (optional)
-    owner_col = None
-    owner_keywords = ['stock owner', 'owner']
-    for keyword in owner_keywords:
-        for col_key in column_names_lower:
-            if keyword in col_key:
-                owner_col = column_names_lower[col_key]
-                break
-        if owner_col:
-            break
-    
-    # Find notes column (optional)
-    notes_col = None
-    notes_keywords = ['notes', 'note']
-    for keyword in notes_keywords:
-        for col_key in column_names_lower:
-            if keyword in col_key:
-                notes_col = column_names_lower[col_key]
-                break
-        if notes_col:
-            break
+    # Find owner and notes columns (optional)
+    owner_col = _find_col(column_names_lower, ['stock owner', 'owner'])
+    notes_col = _find_col(column_names_lower, ['notes', 'note'])
     
     # Find chromosome columns (only 2, 3, 4 - no X)
     chrom_cols = {}
-    for col_key in column_names_lower:
-        if 'chromosome' in col_key:
-            # Extract chromosome name (2, 3, 4 only - no X)
-            col_name = column_names_lower[col_key]
-            if '2' in col_key:
-                chrom_cols['2'] = col_name
-            elif '3' in col_key:
-                chrom_cols['3'] = col_name
-            elif '4' in col_key:
-                chrom_cols['4'] = col_name
-            # Skip chromosome X
+    for col_key, col_name in column_names_lower.items():
+        match = _CHROMOSOME_COL_RE.search(col_key)
+        if match and match.group(1) != 'x':  # Skip chromosome X
+            chrom_cols[match.group(1)] = col_name
+    
+    # Stripped text of every needed column, converted once per column (blank owner reads as 'nan')
+    names = _column_strings(df, name_col, na_value='nan')
+    owners = _column_strings(df, owner_col, na_value='nan') if owner_col else [""] * len(df)
+    notes_values = _column_strings(df, notes_col, na_value='') if notes_col else [""] * len(df)
+    
+    # Build genotype strings from chromosome data (only 2, 3, 4) column-wise, not cell by cell
+    genotype_strs, has_valid_data = _chromosome_genotype_strings(df, chrom_cols)
     
     # Parse stocks
-    for idx, row in df.iterrows():
+    rows = zip(df.index, names, owners, notes_values, genotype_strs, has_valid_data)
+    for idx, stock_name, owner, notes_str, genotype_str, row_has_data in rows:
         try:
-            stock_name = str(row[name_col]).strip()
-            owner = str(row[owner_col]).strip() if owner_col else ""
-            
             # Skip rows with no name
             if not stock_name or stock_name.lower() == 'nan':
                 continue
             
-            # Build genotype from chromosome data (only 2, 3, 4)
-            genotype_parts = []
-            has_valid_data = False
-            
-            for chrom in ['2', '3', '4']:
-                if chrom in chrom_cols:
-                    cell_value = row[chrom_cols[chrom]]
-                    # Check for NaN or None
-                    if pd.isna(cell_value) or str(cell_value).strip().lower() == 'nan':
-                        alleles_str = ""
-                    else:
-                        alleles_str = str(cell_value).strip()
-                        alleles_str = alleles_str.replace(' ', '')
-                        has_valid_data = True
-                    
-                    if alleles_str:
-                        genotype_parts.append(f"{chrom}:{alleles_str}")
-            
             # Skip rows with no chromosome data
-            if not has_valid_data:
+            if not row_has_data:
                 continue
             
-            genotype_str = " ".join(genotype_parts)
-            
             # Parse to validate and get internal format
             internal_genotype = {}
             
@@ -235,19 +394,18 @@ def _parse_chromosome_format(df: pd.DataFrame, column_names_lower: Dict, lab_sto
                 
                 if '/' not in alleles_str:
                     # Single allele for autosome - convert to diploid
-                    internal_genotype[chrom] = (alleles_str, alleles_str)
+                    allele = sys.intern(alleles_str)
+                    internal_genotype[sys.intern(chrom)] = (allele, allele)
                 else:
                     # Diploid - split by /
                     parts = alleles_str.split('/')
                     if len(parts) != 2:
                         raise ValueError(f"Invalid allele format: {alleles_str}")
                     allele1, allele2 = parts
-                    internal_genotype[chrom] = (allele1, allele2)
+                    internal_genotype[sys.intern(chrom)] = (sys.intern(allele1), sys.intern(allele2))
             
             # Create single entry per stock (sex-agnostic)
             # Gender will be determined dynamically during crossing
-            notes_str = str(row[notes_col]).strip() if notes_col and not pd.isna(row[notes_col]) else ""
-            
             lab_stocks.append({
                 'name': stock_name,
                 'genotype': genotype_str,
@@ -259,6 +417,40 @@ def _parse_chromosome_format(df: pd.DataFrame, column_names_lower: Dict, lab_sto
             raise ValueError(f"Error processing row {idx + 2}: {e}")
 
 
+def _column_strings(df: "pd.DataFrame", col: str, na_value: str) -> List[str]:
+    """
+    str(cell).strip() for every cell of a column, done once through the pandas string
+    dtype instead of per cell. Missing cells (NaN/None) become na_value.
+    """
+    return df[col].astype("string").str.strip().fillna(na_value).tolist()
+
+
+def _chromosome_genotype_strings(df: "pd.DataFrame", chrom_cols: Dict[str, str]) -> Tuple[List[str], List[bool]]:
+    """
+    For every row, the external genotype string built from the chromosome columns
+    (e.g. "2:CyO/+ 3:+/+") and whether any chromosome cell held data.
+    
+    A cell counts as data unless it is NaN/None or the text 'nan'; spaces inside a cell
+    are removed. Done with pandas string methods over whole columns.
+    """
+    pieces = []
+    has_data = [False] * len(df)
+    
+    for chrom in ['2', '3', '4']:
+        if chrom not in chrom_cols:
+            continue
+        column = df[chrom_cols[chrom]]
+        text = column.astype("string").str.strip()
+        cell_ok = (column.notna() & text.str.lower().ne('nan')).fillna(False).astype(bool)
+        alleles = text.str.replace(' ', '', regex=False).where(cell_ok, '')
+        pieces.append((f"{chrom}:" + alleles).where(alleles != '', '').tolist())
+        has_data = [a or b for a, b in zip(has_data, cell_ok.tolist())]
+    
+    if not pieces:
+        return [''] * len(df), has_data
+    return [" ".join(p for p in parts if p) for parts in zip(*pieces)], has_data
+
+
 def get_stock_by_name(lab_stocks: List[Dict], stock_name: str) -> Dict:
     """
     Retrieve a specific stock by name from the lab stocks list.
@@ -273,9 +465,14 @@ def get_stock_by_name(lab_stocks: List[Dict], stock_name: str) -> Dict:
     Raises:
         ValueError: If stock is not found
     """
-    for stock in lab_stocks:
-        if stock['name'].lower() == stock_name.lower():
+    if isinstance(lab_stocks, LabStocks):
+        stock = lab_stocks.find(stock_name)
+        if stock is not None:
             return stock
+    else:
+        for stock in lab_stocks:
+            if stock['name'].lower() == stock_name.lower():
+                return stock
     
     available_names = [s['name'] for s in lab_stocks]
     raise ValueError(f"Stock '{stock_name}' not found. Available stocks: {available_names}")
@@ -11,15 +11,20 @@ This file NOW validates:
 - target genotype (optional but recommended)
 """
 
-from typing import List, Dict, Tuple, Optional
-from dataclasses import dataclass, field
-
-from drosophila_cross_generator import InternalGenotype, AUTOSOME_CHROMOSOMES
+import heapq
+import sys
+import threading
+from functools import lru_cache
+from typing import List, Dict, FrozenSet, Tuple, Optional
+from dataclasses import dataclass, field, InitVar
+
+from drosophila_cross_generator import InternalGenotype, GenotypeKey, AUTOSOME_CHROMOSOMES, CHROMOSOME_ORDER
 from genotype_parser import external_to_internal
 from cross_logic import (
+    genotype_to_key,
     get_unique_offspring,
     is_lethal,
-    has_balancer,
+    pair_has_balancer,
     validate_stock_genotype,
 )
 
@@ -28,6 +33,10 @@ from cross_logic import (
 # Female eligibility (your biological constraint)
 # ----------------------------------------------------------------------------
 
+# Autosomes in canonical order, so equal genotypes give equal cache keys
+_AUTOSOME_ORDER = tuple(chrom for chrom in CHROMOSOME_ORDER if chrom in AUTOSOME_CHROMOSOMES)
+
+
 def is_homozygous(a1: str, a2: str) -> bool:
     return a1 == a2
 
@@ -38,13 +47,16 @@ def allowed_as_female_parent(genotype: InternalGenotype) -> bool:
     - homozygous: OK
     - heterozygous: at least one allele has a balancer marker
     """
-    for chrom in AUTOSOME_CHROMOSOMES:
-        if chrom not in genotype:
-            continue
-        a1, a2 = genotype[chrom]
+    return _female_eligible_pairs(tuple(genotype[chrom] for chrom in _AUTOSOME_ORDER if chrom in genotype))
+
+
+@lru_cache(maxsize=None)
+def _female_eligible_pairs(allele_pairs: Tuple[Tuple[str, str], ...]) -> bool:
+    """allowed_as_female_parent() over the autosome allele pairs; offspring genotypes recur across broods."""
+    for a1, a2 in allele_pairs:
         if is_homozygous(a1, a2):
             continue
-        if not (has_balancer(a1) or has_balancer(a2)):
+        if not pair_has_balancer(a1, a2):
             return False
     return True
 
@@ -53,7 +65,11 @@ def allowed_as_female_parent(genotype: InternalGenotype) -> bool:
 # Data structures
 # ----------------------------------------------------------------------------
 
-@dataclass
+# The planner creates many of these per generation: use __slots__ where dataclasses support it
+_DATACLASS_OPTIONS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class CrossPlan:
     generation: int
     parent1_name: str
@@ -68,16 +84,21 @@ class CrossPlan:
     intermediate_name: Optional[str] = None
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class StockState:
     stock_name: str
     genotype: InternalGenotype
     role: str  # "F" or "M" (label only; actual role assignment is decided per cross)
     route_probability: float = 1.0
     provenance: List[CrossPlan] = field(default_factory=list)
+    # Chromosomes present in the genotype; only states with equal signatures can be crossed
+    chrom_signature: FrozenSet[str] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.chrom_signature = frozenset(self.genotype)
 
 
-@dataclass
+@dataclass(**_DATACLASS_OPTIONS)
 class Brood:
     brood_id: str
     generation: int
@@ -86,9 +107,20 @@ class Brood:
     route_probability: float
     provenance_base: List[CrossPlan]
     offspring_distribution: List[Tuple[InternalGenotype, float]] = field(default_factory=list)
+    # Flags computed alongside offspring_distribution (see offspring_table); None -> compute here
+    eligibility: InitVar[Optional[List[bool]]] = None
+    # allowed_as_female_parent() for each entry of offspring_distribution
+    female_eligible: List[bool] = field(init=False)
 
+    def __post_init__(self, eligibility: Optional[List[bool]]):
+        if eligibility is None:
+            eligibility = female_eligibility(self.offspring_distribution)
+        elif len(eligibility) != len(self.offspring_distribution):
+            raise ValueError("eligibility must have one flag per offspring_distribution entry")
+        self.female_eligible = eligibility
 
-@dataclass
+
+@dataclass(**_DATACLASS_OPTIONS)
 class BreedingPlan:
     steps: List[CrossPlan]
     total_generations: int
@@ -100,18 +132,70 @@ class BreedingPlan:
 # Utilities
 # ----------------------------------------------------------------------------
 
+CanonicalGenotype = Tuple[Tuple[str, Tuple[str, ...]], ...]
+
+
+def canonical_genotype(genotype: InternalGenotype) -> CanonicalGenotype:
+    """
+    Order-free form of a genotype: chromosomes sorted, alleles sorted within each chromosome.
+    Two genotypes match iff their canonical forms are equal.
+    """
+    # tuple(items) is the genotype frozen as-is (no sorting), cheap enough to use as a cache key
+    return _canonical_from_items(tuple(genotype.items()))
+
+
+@lru_cache(maxsize=None)
+def _canonical_from_items(items: Tuple[Tuple[str, Tuple[str, str]], ...]) -> CanonicalGenotype:
+    return tuple(sorted((chrom, tuple(sorted(alleles))) for chrom, alleles in items))
+
+
 def genotypes_match(g1: InternalGenotype, g2: InternalGenotype) -> bool:
-    if set(g1.keys()) != set(g2.keys()):
-        return False
-    for chrom in g1:
-        if set(g1[chrom]) != set(g2[chrom]):
-            return False
-    return True
+    return canonical_genotype(g1) == canonical_genotype(g2)
+
+
+# Offspring distribution of an ordered (female, male) cross and the female-role flag of each entry
+OffspringTable = Tuple[List[Tuple[InternalGenotype, float]], List[bool]]
+OffspringCache = Dict[Tuple[GenotypeKey, GenotypeKey], OffspringTable]
+
+
+def female_eligibility(dist: List[Tuple[InternalGenotype, float]]) -> List[bool]:
+    """allowed_as_female_parent() for each genotype of an offspring distribution."""
+    return [allowed_as_female_parent(g) for g, _ in dist]
+
+
+def offspring_table(female: InternalGenotype, male: InternalGenotype,
+                    cache: Optional[OffspringCache] = None) -> OffspringTable:
+    """
+    (get_unique_offspring(female, male), female_eligibility of it), memoized in `cache`
+    (one dict per planning run) so both are computed once per distribution.
+    Keyed on the ordered (female, male) pair: roles are not interchangeable.
+    The cached lists are shared between callers and must not be mutated.
+    """
+    if cache is None:
+        dist = get_unique_offspring(female, male)
+        return dist, female_eligibility(dist)
+    key = (genotype_to_key(female), genotype_to_key(male))
+    table = cache.get(key)
+    if table is None:
+        dist = get_unique_offspring(female, male)
+        table = cache[key] = (dist, female_eligibility(dist))
+    return table
+
+
+def offspring_distribution(female: InternalGenotype, male: InternalGenotype,
+                           cache: Optional[OffspringCache] = None) -> List[Tuple[InternalGenotype, float]]:
+    """get_unique_offspring(female, male), memoized in `cache` via offspring_table()."""
+    if cache is None:
+        return get_unique_offspring(female, male)
+    return offspring_table(female, male, cache)[0]
 
 
 def merge_provenance(a: List[CrossPlan], b: List[CrossPlan]) -> List[CrossPlan]:
     i = 0
-    while i < len(a) and i < len(b) and a[i] == b[i]:
+    n = min(len(a), len(b))
+    # Shared prefixes are normally the very same CrossPlan objects, so try identity first;
+    # equal-but-distinct steps (e.g. from duplicate parent pairs) still merge via ==.
+    while i < n and (a[i] is b[i] or a[i] == b[i]):
         i += 1
     return a + b[i:]
 
@@ -137,18 +221,20 @@ def consider_sibling_crosses(
     target_genotype: InternalGenotype,
     generation: int,
     max_generations: int,
-    top_k_per_role: int = 20
+    top_k_per_role: int = 20,
+    offspring_cache: Optional[OffspringCache] = None,
 ) -> List[BreedingPlan]:
     plans: List[BreedingPlan] = []
+    target_canon = canonical_genotype(target_genotype)
 
     female_candidates: List[Tuple[int, InternalGenotype, float]] = []
     male_candidates: List[Tuple[int, InternalGenotype, float]] = []
 
-    for idx, (g, f) in enumerate(brood.offspring_distribution):
+    for idx, ((g, f), female_ok) in enumerate(zip(brood.offspring_distribution, brood.female_eligible)):
         if is_lethal(g):
             continue
         male_candidates.append((idx, g, f))
-        if allowed_as_female_parent(g):
+        if female_ok:
             female_candidates.append((idx, g, f))
 
     female_candidates = female_candidates[:top_k_per_role]
@@ -159,12 +245,12 @@ def consider_sibling_crosses(
             if f_idx == m_idx:
                 continue
 
-            offspring2 = get_unique_offspring(f_gen, m_gen)
+            offspring2 = offspring_distribution(f_gen, m_gen, offspring_cache)
             if not offspring2:
                 continue
 
             for child_gen, child_freq in offspring2:
-                if genotypes_match(child_gen, target_genotype):
+                if canonical_genotype(child_gen) == target_canon:
                     total_prob = brood.route_probability * f_freq * m_freq * child_freq
 
                     f_pick = CrossPlan(
@@ -226,11 +312,18 @@ def consider_sibling_crosses(
 # Main planner
 # ----------------------------------------------------------------------------
 
-def plan_to_target(lab_stocks: List[Dict], target_genotype_str: str, max_generations: int) -> Optional[BreedingPlan]:
+def plan_to_target(lab_stocks: List[Dict], target_genotype_str: str, max_generations: int,
+                   cancel_event: Optional[threading.Event] = None) -> Optional[BreedingPlan]:
+    """
+    Search up to max_generations for the most direct / most probable plan to the target.
+    If cancel_event is given and gets set (e.g. from the GUI thread), the search stops early
+    and returns None.
+    """
     target_genotype, _ = external_to_internal(target_genotype_str)
 
     # Validate target + input stocks here (ENFORCED even without GUI)
     validate_stock_genotype(target_genotype, context="target genotype")
+    target_canon = canonical_genotype(target_genotype)
     for s in lab_stocks:
         validate_stock_genotype(s["internal_genotype"], context=f"input stock '{s['name']}'")
 
@@ -246,19 +339,35 @@ def plan_to_target(lab_stocks: List[Dict], target_genotype_str: str, max_generat
     best: Optional[BreedingPlan] = None
     brood_counter = 0
 
+    # Virtual stocks repeat genotypes across broods/generations: compute each cross once per run
+    offspring_cache: OffspringCache = {}
+
     for generation in range(1, max_generations + 1):
         current_states = states_by_gen[0] + states_by_gen.get(generation - 1, [])
-        next_states: List[StockState] = []
+        # One virtual per (canonical genotype, role): only the best route to it is kept
+        next_states: Dict[Tuple[CanonicalGenotype, str], StockState] = {}
         gen_plans: List[BreedingPlan] = []
 
-        # ---- standard crosses ----
-        for i, s1 in enumerate(current_states):
-            for s2 in current_states[i:]:
-                if set(s1.genotype.keys()) != set(s2.genotype.keys()):
-                    continue
+        # Bucket states by chromosome signature (keeping list order) so pairs are only formed
+        # within a bucket; visits the same (s1, s2) pairs in the same order as a filtered i <= j scan.
+        buckets: Dict[FrozenSet[str], List[StockState]] = {}
+        for s in current_states:
+            buckets.setdefault(s.chrom_signature, []).append(s)
+        bucket_pos: Dict[FrozenSet[str], int] = {}
 
+        # ---- standard crosses ----
+        for s1 in current_states:
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            group = buckets[s1.chrom_signature]
+            pos = bucket_pos.get(s1.chrom_signature, 0)
+            bucket_pos[s1.chrom_signature] = pos + 1
+
+            for s2 in group[pos:]:
                 for fem_state, mal_state in iter_role_oriented_pairs(s1, s2):
-                    dist = get_unique_offspring(fem_state.genotype, mal_state.genotype)
+                    dist, dist_female_eligible = offspring_table(
+                        fem_state.genotype, mal_state.genotype, offspring_cache
+                    )
                     if not dist:
                         continue
 
@@ -273,12 +382,21 @@ def plan_to_target(lab_stocks: List[Dict], target_genotype_str: str, max_generat
                         route_probability=fem_state.route_probability * mal_state.route_probability,
                         provenance_base=merge_provenance(fem_state.provenance, mal_state.provenance),
                         offspring_distribution=dist,
+                        eligibility=dist_female_eligible,
                     )
                     broods_by_gen.setdefault(generation, []).append(brood)
 
-                    # Check for target
-                    for child_gen, child_freq in dist:
-                        if genotypes_match(child_gen, target_genotype):
+                    # One pass over dist: the first offspring matching the target becomes a plan,
+                    # and the top 20 (when another generation follows) become virtual stocks
+                    top_k = min(20, len(dist)) if generation < max_generations else 0
+                    found_target = False
+                    for j, (child_gen, child_freq) in enumerate(dist):
+                        if found_target and j >= top_k:
+                            break
+                        child_canon = canonical_genotype(child_gen)
+
+                        if not found_target and child_canon == target_canon:
+                            found_target = True
                             total_prob = brood.route_probability * child_freq
 
                             final = CrossPlan(
@@ -302,17 +420,14 @@ def plan_to_target(lab_stocks: List[Dict], target_genotype_str: str, max_generat
                                     target_genotype=target_genotype,
                                 )
                             )
-                            break
 
-                    # Create virtuals for next generation
-                    if generation < max_generations:
-                        top_k = min(20, len(dist))
-                        for j, (child_gen, child_freq) in enumerate(dist[:top_k]):
-                            if is_lethal(child_gen):
-                                continue
+                        if j >= top_k or is_lethal(child_gen):
+                            continue
 
-                            child_route = brood.route_probability * child_freq
+                        child_route = brood.route_probability * child_freq
 
+                        kept = next_states.get((child_canon, "M"))
+                        if kept is None or child_route > kept.route_probability:
                             m_step = CrossPlan(
                                 generation=generation,
                                 parent1_name=fem_state.stock_name,
@@ -327,55 +442,56 @@ def plan_to_target(lab_stocks: List[Dict], target_genotype_str: str, max_generat
                                 intermediate_name=f"F{generation}_{fem_state.stock_name}_x_{mal_state.stock_name}_M_{j}",
                             )
                             m_prov = brood.provenance_base + [m_step]
-                            next_states.append(
-                                StockState(
-                                    stock_name=m_step.intermediate_name,
-                                    genotype=child_gen,
-                                    role="M",
-                                    route_probability=child_route,
-                                    provenance=m_prov,
-                                )
+                            next_states[(child_canon, "M")] = StockState(
+                                stock_name=m_step.intermediate_name,
+                                genotype=child_gen,
+                                role="M",
+                                route_probability=child_route,
+                                provenance=m_prov,
                             )
 
-                            if allowed_as_female_parent(child_gen):
-                                f_step = CrossPlan(
-                                    generation=generation,
-                                    parent1_name=fem_state.stock_name,
-                                    parent1_genotype=fem_state.genotype,
-                                    parent1_sex="F",
-                                    parent2_name=mal_state.stock_name,
-                                    parent2_genotype=mal_state.genotype,
-                                    parent2_sex="M",
-                                    target_genotype=child_gen,
-                                    target_probability=child_freq,
-                                    intermediate_genotype=child_gen,
-                                    intermediate_name=f"F{generation}_{fem_state.stock_name}_x_{mal_state.stock_name}_F_{j}",
-                                )
-                                f_prov = brood.provenance_base + [f_step]
-                                next_states.append(
-                                    StockState(
-                                        stock_name=f_step.intermediate_name,
-                                        genotype=child_gen,
-                                        role="F",
-                                        route_probability=child_route,
-                                        provenance=f_prov,
-                                    )
-                                )
+                        kept = next_states.get((child_canon, "F"))
+                        if brood.female_eligible[j] and (kept is None or child_route > kept.route_probability):
+                            f_step = CrossPlan(
+                                generation=generation,
+                                parent1_name=fem_state.stock_name,
+                                parent1_genotype=fem_state.genotype,
+                                parent1_sex="F",
+                                parent2_name=mal_state.stock_name,
+                                parent2_genotype=mal_state.genotype,
+                                parent2_sex="M",
+                                target_genotype=child_gen,
+                                target_probability=child_freq,
+                                intermediate_genotype=child_gen,
+                                intermediate_name=f"F{generation}_{fem_state.stock_name}_x_{mal_state.stock_name}_F_{j}",
+                            )
+                            f_prov = brood.provenance_base + [f_step]
+                            next_states[(child_canon, "F")] = StockState(
+                                stock_name=f_step.intermediate_name,
+                                genotype=child_gen,
+                                role="F",
+                                route_probability=child_route,
+                                provenance=f_prov,
+                            )
 
         # ---- sibling crosses ----
         if generation > 1 and (generation - 1) in broods_by_gen:
             for brood in broods_by_gen[generation - 1]:
+                if cancel_event is not None and cancel_event.is_set():
+                    return None
                 gen_plans.extend(
-                    consider_sibling_crosses(brood, target_genotype, generation, max_generations)
+                    consider_sibling_crosses(brood, target_genotype, generation, max_generations,
+                                             offspring_cache=offspring_cache)
                 )
 
         # prune virtuals/broods
-        next_states.sort(key=lambda s: s.route_probability, reverse=True)
-        states_by_gen[generation] = next_states[:30]
+        # nlargest == sorted(..., reverse=True)[:k], ties kept in insertion order, without a full sort
+        states_by_gen[generation] = heapq.nlargest(30, next_states.values(), key=lambda s: s.route_probability)
 
         if generation in broods_by_gen:
-            broods_by_gen[generation].sort(key=lambda b: b.route_probability, reverse=True)
-            broods_by_gen[generation] = broods_by_gen[generation][:50]
+            broods_by_gen[generation] = heapq.nlargest(
+                50, broods_by_gen[generation], key=lambda b: b.route_probability
+            )
 
         # update best
         for p in gen_plans:
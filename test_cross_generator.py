@@ -10,74 +10,101 @@ Tests validate:
 - Frequency calculations
 - Mendelian segregation
 - Female eligibility for breeding role (role-based model)
+
+Run with --quiet (or CROSSTEST_QUIET=1) to skip per-check output and genotype
+formatting, e.g. when timing or profiling; assertions still run.
 """
 
+import os
+import shutil
+import sys
+import tempfile
+import threading
+
+import pandas as pd
+
 from drosophila_cross_generator import InternalGenotype, Sex
 from genotype_parser import external_to_internal, internal_to_external
 from cross_logic import (
-    get_gametes, cross, get_unique_offspring, is_lethal, has_balancer
+    get_gametes, cross, get_unique_offspring, is_lethal, has_balancer,
+    cross_counts, genotype_to_key, key_to_genotype, get_unique_offspring_keys,
+    is_lethal_key, has_homozygous_balancer, has_homozygous_balancer_key,
+    validate_stock_genotype
 )
-from target_planner import allowed_as_female_parent
+from target_planner import allowed_as_female_parent, plan_to_target, canonical_genotype
+from lab_stocks import read_lab_stocks, append_stock_row, get_stock_by_name, LabStocks
+
+_QUIET_ENV = os.environ.get("CROSSTEST_QUIET", "").strip().lower()
+QUIET = "--quiet" in sys.argv[1:] or _QUIET_ENV not in ("", "0", "false", "no")
+
+
+def _silent(*args, **kwargs):
+    pass
+
+
+# Per-check output. Lines that format genotypes use print inside `if not QUIET:` instead,
+# so the formatting itself is skipped when quiet.
+log = _silent if QUIET else print
 
 
-print("=" * 80)
-print("DROSOPHILA CROSS GENERATOR - COMPREHENSIVE TEST SUITE")
-print("=" * 80)
+log("=" * 80)
+log("DROSOPHILA CROSS GENERATOR - COMPREHENSIVE TEST SUITE")
+log("=" * 80)
 
 
 # ============================================================================
 # Tests for: genotype_parser.external_to_internal
 # ============================================================================
-print("\n[Test Suite 1] external_to_internal - Female genotype parsing")
-print("-" * 80)
+log("\n[Test Suite 1] external_to_internal - Female genotype parsing")
+log("-" * 80)
 
 external_female = "2:CyO/+ 3:TM6B/+ 4:+/+"
 internal_f, sex_f = external_to_internal(external_female)
-print(f"Input:  {external_female}")
-print(f"Output: {internal_f}")
-print(f"Sex:    {sex_f}")
+log(f"Input:  {external_female}")
+log(f"Output: {internal_f}")
+log(f"Sex:    {sex_f}")
 assert internal_f["2"] == ("CyO", "+"), "Chromosome 2 parsing failed"
-print("✓ Passed: Female genotype correctly parsed\n")
+log("✓ Passed: Female genotype correctly parsed\n")
 
-print("[Test Suite 2] external_to_internal - Male genotype parsing")
-print("-" * 80)
+log("[Test Suite 2] external_to_internal - Male genotype parsing")
+log("-" * 80)
 
 external_male = "2:CyO/+ 3:TM6B/+ 4:+/+"
 internal_m, sex_m = external_to_internal(external_male)
-print(f"Input:  {external_male}")
-print(f"Output: {internal_m}")
-print(f"Sex:    {sex_m}")
+log(f"Input:  {external_male}")
+log(f"Output: {internal_m}")
+log(f"Sex:    {sex_m}")
 assert internal_m["2"] == ("CyO", "+"), "Chromosome 2 parsing failed"
-print("✓ Passed: Male genotype correctly parsed\n")
+log("✓ Passed: Male genotype correctly parsed\n")
 
 
 # ============================================================================
 # Tests for: genotype_parser.internal_to_external
 # ============================================================================
-print("[Test Suite 3] internal_to_external - Female genotype formatting")
-print("-" * 80)
+log("[Test Suite 3] internal_to_external - Female genotype formatting")
+log("-" * 80)
 
 external_f_out = internal_to_external(internal_f, sex_f)
-print(f"Input:  {internal_f}, Sex: {sex_f}")
-print(f"Output: {external_f_out}")
+log(f"Input:  {internal_f}, Sex: {sex_f}")
+log(f"Output: {external_f_out}")
 assert external_f_out == external_female, "Female round-trip conversion failed"
-print("✓ Passed: Female genotype correctly formatted\n")
+log("✓ Passed: Female genotype correctly formatted\n")
 
-print("[Test Suite 4] internal_to_external - Male genotype formatting")
-print("-" * 80)
+log("[Test Suite 4] internal_to_external - Male genotype formatting")
+log("-" * 80)
 
 external_m_out = internal_to_external(internal_m, sex_m)
-print(f"Input:  {internal_m}, Sex: {sex_m}")
-print(f"Output: {external_m_out}")
+log(f"Input:  {internal_m}, Sex: {sex_m}")
+log(f"Output: {external_m_out}")
 assert external_m_out == external_male, "Male round-trip conversion failed"
-print("✓ Passed: Male genotype correctly formatted\n")
+log("✓ Passed: Male genotype correctly formatted\n")
 
 
 # ============================================================================
 # Tests for: cross_logic.has_balancer
 # ============================================================================
-print("[Test Suite 5] has_balancer - Identifying balancer alleles")
-print("-" * 80)
+log("[Test Suite 5] has_balancer - Identifying balancer alleles")
+log("-" * 80)
 
 test_cases = [
     ("CyO", True, "CyO is a balancer"),
@@ -88,101 +115,106 @@ test_cases = [
     ("w_FM7", True, "FM7 in allele name is a balancer"),
 ]
 
+# Check every case before asserting so one run reports all failures
+failures = []
 for allele, expected, description in test_cases:
     result = has_balancer(allele)
-    print(f"  {allele}: {result} - {description}")
-    assert result == expected, f"Failed: {description}"
-print("✓ Passed: Balancer detection works correctly\n")
+    log(f"  {allele}: {result} - {description}")
+    if result != expected:
+        failures.append(description)
+assert not failures, "Failed: " + "; ".join(failures)
+log("✓ Passed: Balancer detection works correctly\n")
 
 
 # ============================================================================
 # Tests for: cross_logic.is_lethal
 # ============================================================================
-print("[Test Suite 6] is_lethal - Homozygous lethal markers")
-print("-" * 80)
+log("[Test Suite 6] is_lethal - Homozygous lethal markers")
+log("-" * 80)
 
 lethal_genotype = {"2": ("CyO", "CyO"), "3": ("+", "+"), "4": ("+", "+")}
-print(f"Genotype: {lethal_genotype}")
-print(f"Is lethal: {is_lethal(lethal_genotype)}")
+log(f"Genotype: {lethal_genotype}")
+log(f"Is lethal: {is_lethal(lethal_genotype)}")
 assert is_lethal(lethal_genotype), "CyO/CyO should be lethal"
-print("✓ Passed: Homozygous CyO is lethal\n")
+log("✓ Passed: Homozygous CyO is lethal\n")
 
-print("[Test Suite 7] is_lethal - FM7 is NOT lethal")
-print("-" * 80)
+log("[Test Suite 7] is_lethal - FM7 is NOT lethal")
+log("-" * 80)
 
 fm7_genotype = {"2": ("+", "+"), "3": ("+", "+"), "4": ("+", "+")}
-print(f"Genotype: {fm7_genotype}")
-print(f"Is lethal: {is_lethal(fm7_genotype)}")
+log(f"Genotype: {fm7_genotype}")
+log(f"Is lethal: {is_lethal(fm7_genotype)}")
 assert not is_lethal(fm7_genotype), "FM7/FM7 should NOT be lethal (non-lethal balancer)"
-print("✓ Passed: Homozygous FM7 is NOT lethal\n")
+log("✓ Passed: Homozygous FM7 is NOT lethal\n")
 
-print("[Test Suite 8] is_lethal - Heterozygous balancers are viable")
-print("-" * 80)
+log("[Test Suite 8] is_lethal - Heterozygous balancers are viable")
+log("-" * 80)
 
 viable_genotype = {"2": ("CyO", "+"), "3": ("+", "+"), "4": ("+", "+")}
-print(f"Genotype: {viable_genotype}")
-print(f"Is lethal: {is_lethal(viable_genotype)}")
+log(f"Genotype: {viable_genotype}")
+log(f"Is lethal: {is_lethal(viable_genotype)}")
 assert not is_lethal(viable_genotype), "CyO/+ should be viable (heterozygous)"
-print("✓ Passed: Heterozygous balancer is viable\n")
+log("✓ Passed: Heterozygous balancer is viable\n")
 
 
 # ============================================================================
 # Tests for: cross_logic.get_gametes
 # ============================================================================
-print("[Test Suite 9] get_gametes - Male gamete production")
-print("-" * 80)
+log("[Test Suite 9] get_gametes - Male gamete production")
+log("-" * 80)
 
 male_genotype = {"2": ("a", "+"), "3": ("+", "+"), "4": ("+", "+")}
 male_gametes = get_gametes(male_genotype, "M")
-print(f"Male genotype: {male_genotype}")
-print(f"Number of gamete types: {len(male_gametes)}")
+log(f"Male genotype: {male_genotype}")
+log(f"Number of gamete types: {len(male_gametes)}")
 for i, gamete in enumerate(male_gametes):
-    print(f"  Gamete {i+1}: {gamete}")
+    log(f"  Gamete {i+1}: {gamete}")
 assert len(male_gametes) == 2, "Male with one heterozygous autosome should produce 2 gamete types"
-print("✓ Passed: Male gamete production correct\n")
+log("✓ Passed: Male gamete production correct\n")
 
-print("[Test Suite 10] get_gametes - Female gamete production")
-print("-" * 80)
+log("[Test Suite 10] get_gametes - Female gamete production")
+log("-" * 80)
 
 female_genotype = {"2": ("a", "+"), "3": ("b", "+"), "4": ("+", "+")}
 female_gametes = get_gametes(female_genotype, "F")
-print(f"Female genotype: {female_genotype}")
-print(f"Number of gamete types: {len(female_gametes)}")
+log(f"Female genotype: {female_genotype}")
+log(f"Number of gamete types: {len(female_gametes)}")
 for i, gamete in enumerate(female_gametes):
-    print(f"  Gamete {i+1}: {gamete}")
+    log(f"  Gamete {i+1}: {gamete}")
 assert len(female_gametes) == 4, "Female with two heterozygous chromosomes should produce 4 gamete types"
-print("✓ Passed: Female gamete production correct\n")
+log("✓ Passed: Female gamete production correct\n")
 
-print("[Test Suite 11] get_gametes - Female with balancer (recombination suppression)")
-print("-" * 80)
+log("[Test Suite 11] get_gametes - Female with balancer (recombination suppression)")
+log("-" * 80)
 
 female_bal_genotype = {"2": ("CyO", "a"), "3": ("+", "+"), "4": ("+", "+")}
 female_bal_gametes = get_gametes(female_bal_genotype, "F")
-print(f"Female genotype: {female_bal_genotype}")
-print(f"Number of gamete types: {len(female_bal_gametes)}")
+log(f"Female genotype: {female_bal_genotype}")
+log(f"Number of gamete types: {len(female_bal_gametes)}")
 for i, gamete in enumerate(female_bal_gametes):
-    print(f"  Gamete {i+1}: {gamete}")
+    log(f"  Gamete {i+1}: {gamete}")
 # Balancer suppresses recombination but gametes still segregate normally
 assert len(female_bal_gametes) == 2, "Female with one heterozygous balanced chromosome should produce 2 gamete types"
-print("✓ Passed: Balancer-suppressed recombination correct\n")
+log("✓ Passed: Balancer-suppressed recombination correct\n")
 
 
-print("[Test Suite 12] cross - Simple cross with new role-based model")
-print("-" * 80)
+log("[Test Suite 12] cross - Simple cross with new role-based model")
+log("-" * 80)
 
 # New model: cross() takes only genotypes, no sex parameter (sex is a breeding ROLE)
 female = {"2": ("+", "+"), "3": ("+", "+"), "4": ("+", "+")}
 male = {"2": ("CyO", "+"), "3": ("+", "+"), "4": ("+", "+")}
 # In new model, we cross female role × male role as separate parameters to cross()
 offspring_pairs = cross(female, male)
-print(f"Female role genotype: {internal_to_external(female, 'F')}")
-print(f"Male role genotype:   {internal_to_external(male, 'M')}")
-print(f"Offspring count: {len(offspring_pairs)}")
+if not QUIET:
+    print(f"Female role genotype: {internal_to_external(female, 'F')}")
+    print(f"Male role genotype:   {internal_to_external(male, 'M')}")
+log(f"Offspring count: {len(offspring_pairs)}")
 assert len(offspring_pairs) > 0, "Cross should produce offspring"
-print("✓ Passed: Cross produced offspring\n")
+log("✓ Passed: Cross produced offspring\n")
 
-print("[Test Suite 13] cross - Female × Male roles (role-based model)")
-print("-" * 80)
+log("[Test Suite 13] cross - Female × Male roles (role-based model)")
+log("-" * 80)
 
 # New model: get_gametes takes a role parameter ("F" or "M")
 # This determines recombination behavior, not inheritance
@@ -193,63 +225,69 @@ valid_male_geno = {"2": ("CyO", "+"), "3": ("+", "+"), "4": ("+", "+")}
 f_gametes = get_gametes(valid_female_geno, "F")
 # M role produces parental gametes only (no recombination)
 m_gametes = get_gametes(valid_male_geno, "M")
-print(f"Female role (F) gamete types: {len(f_gametes)}")
-print(f"Male role (M) gamete types: {len(m_gametes)}")
+log(f"Female role (F) gamete types: {len(f_gametes)}")
+log(f"Male role (M) gamete types: {len(m_gametes)}")
 assert len(f_gametes) >= 1, "Female role should produce gametes"
 assert len(m_gametes) >= 1, "Male role should produce gametes"
-print("✓ Passed: Role-based gamete production works correctly\n")
+log("✓ Passed: Role-based gamete production works correctly\n")
 
 
-print("[Test Suite 14] cross - Lethality filtering (CyO/CyO excluded)")
-print("-" * 80)
+log("[Test Suite 14] cross - Lethality filtering (CyO/CyO excluded)")
+log("-" * 80)
 
 # CyO/+ × CyO/+ should produce CyO/CyO (lethal) which is filtered out
 cyoo_female = {"2": ("CyO", "+"), "3": ("+", "+"), "4": ("+", "+")}
 cyoo_male = {"2": ("CyO", "+"), "3": ("+", "+"), "4": ("+", "+")}
 cyoo_offspring = cross(cyoo_female, cyoo_male)
-print(f"Female genotype: {internal_to_external(cyoo_female, 'F')}")
-print(f"Male genotype:   {internal_to_external(cyoo_male, 'M')}")
-print(f"Viable offspring count: {len(cyoo_offspring)}")
+if not QUIET:
+    print(f"Female genotype: {internal_to_external(cyoo_female, 'F')}")
+    print(f"Male genotype:   {internal_to_external(cyoo_male, 'M')}")
+log(f"Viable offspring count: {len(cyoo_offspring)}")
 # Expected: CyO/+, +/CyO, +/+ genotypes (CyO/CyO filtered as lethal)
-for i, geno in enumerate(cyoo_offspring[:3]):
-    print(f"  Offspring {i+1}: {internal_to_external(geno, 'F')}")
+if not QUIET:
+    for i, geno in enumerate(cyoo_offspring[:3]):
+        print(f"  Offspring {i+1}: {internal_to_external(geno, 'F')}")
 assert len(cyoo_offspring) <= 4, "Lethal genotypes should be filtered"
 assert not any(g["2"] == ("CyO", "CyO") for g in cyoo_offspring), "CyO/CyO should be filtered (lethal)"
-print("✓ Passed: Lethal CyO/CyO filtered from results\n")
+log("✓ Passed: Lethal CyO/CyO filtered from results\n")
 
 
-print("[Test Suite 15] get_unique_offspring - Frequency calculation")
-print("-" * 80)
+log("[Test Suite 15] get_unique_offspring - Frequency calculation")
+log("-" * 80)
 
 simple_female = {"2": ("CyO", "+"), "3": ("TM3", "+"), "4": ("TM6B", "+")}
 simple_male = {"2": ("CyO", "+"), "3": ("TM3", "+"), "4": ("TM6B", "+")}
 unique_off = get_unique_offspring(simple_female, simple_male)
-print(f"Female genotype: {internal_to_external(simple_female, 'F')}")
-print(f"Male genotype:   {internal_to_external(simple_male, 'M')}")
-print(f"Unique offspring: {len(unique_off)}")
-for genotype, freq in unique_off:
-    print(f"  {internal_to_external(genotype, 'F')}: {freq:.1%}")
+if not QUIET:
+    print(f"Female genotype: {internal_to_external(simple_female, 'F')}")
+    print(f"Male genotype:   {internal_to_external(simple_male, 'M')}")
+log(f"Unique offspring: {len(unique_off)}")
+if not QUIET:
+    for genotype, freq in unique_off:
+        print(f"  {internal_to_external(genotype, 'F')}: {freq:.1%}")
 # Check frequencies sum to 1.0
 total_freq = sum(freq for _, freq in unique_off)
 assert abs(total_freq - 1.0) < 0.001, f"Frequencies should sum to 1.0, got {total_freq}"
-print("✓ Passed: Frequencies calculated correctly\n")
+log("✓ Passed: Frequencies calculated correctly\n")
 
-print("[Test Suite 16] get_unique_offspring - Mendelian segregation (balanced parents)")
-print("-" * 80)
+log("[Test Suite 16] get_unique_offspring - Mendelian segregation (balanced parents)")
+log("-" * 80)
 
 # Female role: balanced on chr 2, chromosome 3 and 4 are +/+
 het_female = {"2": ("CyO", "a"), "3": ("+", "+"), "4": ("+", "+")}
 # Male role: balanced on chr 2, chromosome 3 and 4 are +/+
 homoz_male = {"2": ("CyO", "+"), "3": ("+", "+"), "4": ("+", "+")}
 het_off = get_unique_offspring(het_female, homoz_male)
-print(f"Female genotype: {internal_to_external(het_female, 'F')}")
-print(f"Male genotype:   {internal_to_external(homoz_male, 'M')}")
-print(f"Unique offspring: {len(het_off)}")
-for genotype, freq in het_off:
-    print(f"  {internal_to_external(genotype, 'F')}: {freq:.1%}")
+if not QUIET:
+    print(f"Female genotype: {internal_to_external(het_female, 'F')}")
+    print(f"Male genotype:   {internal_to_external(homoz_male, 'M')}")
+log(f"Unique offspring: {len(het_off)}")
+if not QUIET:
+    for genotype, freq in het_off:
+        print(f"  {internal_to_external(genotype, 'F')}: {freq:.1%}")
 # Should produce multiple genotypes (segregation)
 assert len(het_off) > 0, "Should produce offspring"
-print("✓ Passed: Mendelian segregation with balanced parents correct\n")
+log("✓ Passed: Mendelian segregation with balanced parents correct\n")
 
 
 
@@ -257,51 +295,304 @@ print("✓ Passed: Mendelian segregation with balanced parents correct\n")
 # ============================================================================
 # Tests for: target_planner.allowed_as_female_parent (role-based model)
 # ============================================================================
-print("[Test Suite 17] allowed_as_female_parent - Role-based female eligibility")
-print("-" * 80)
+log("[Test Suite 17] allowed_as_female_parent - Role-based female eligibility")
+log("-" * 80)
 
 # Homozygous - always eligible as female
 homo = {"2": ("+", "+"), "3": ("+", "+"), "4": ("+", "+")}
-print(f"Homozygous {internal_to_external(homo, 'F')}: {allowed_as_female_parent(homo)}")
+if not QUIET:
+    print(f"Homozygous {internal_to_external(homo, 'F')}: {allowed_as_female_parent(homo)}")
 assert allowed_as_female_parent(homo) == True, "Homozygous should be eligible for female role"
 
 # Balanced heterozygous - eligible as female (has balancer)
 balanced = {"2": ("CyO", "+"), "3": ("+", "+"), "4": ("+", "+")}
-print(f"Balanced {internal_to_external(balanced, 'F')}: {allowed_as_female_parent(balanced)}")
+if not QUIET:
+    print(f"Balanced {internal_to_external(balanced, 'F')}: {allowed_as_female_parent(balanced)}")
 assert allowed_as_female_parent(balanced) == True, "Balanced heterozygous should be eligible for female role"
 
 # Unbalanced heterozygous - NOT eligible as female (recombination risk)
 unbalanced = {"2": ("a", "b"), "3": ("+", "+"), "4": ("+", "+")}
-print(f"Unbalanced {internal_to_external(unbalanced, 'F')}: {allowed_as_female_parent(unbalanced)}")
+if not QUIET:
+    print(f"Unbalanced {internal_to_external(unbalanced, 'F')}: {allowed_as_female_parent(unbalanced)}")
 assert allowed_as_female_parent(unbalanced) == False, "Unbalanced heterozygous should NOT be eligible for female role"
 
 # Multiple balancers - eligible as female
 multi_bal = {"2": ("CyO", "TM3"), "3": ("TM6B", "+"), "4": ("+", "+")}
-print(f"Multi-balancer {internal_to_external(multi_bal, 'F')}: {allowed_as_female_parent(multi_bal)}")
+if not QUIET:
+    print(f"Multi-balancer {internal_to_external(multi_bal, 'F')}: {allowed_as_female_parent(multi_bal)}")
 assert allowed_as_female_parent(multi_bal) == True, "Multiple balancers should be eligible for female role"
 
 # Mixed balanced/unbalanced - depends on each chromosome
 mixed_ok = {"2": ("CyO", "+"), "3": ("+", "+"), "4": ("a", "b")}
-print(f"Mixed (bal/unbal) {internal_to_external(mixed_ok, 'F')}: {allowed_as_female_parent(mixed_ok)}")
+if not QUIET:
+    print(f"Mixed (bal/unbal) {internal_to_external(mixed_ok, 'F')}: {allowed_as_female_parent(mixed_ok)}")
 assert allowed_as_female_parent(mixed_ok) == False, "If any autosome is unbalanced heterozygous, not eligible"
 
-print("✓ Passed: Role-based female eligibility works correctly\n")
+log("✓ Passed: Role-based female eligibility works correctly\n")
 
 
 # ============================================================================
-# SUMMARY
+# Tests for: cross_logic.cross_counts
+# ============================================================================
+log("[Test Suite 18] cross_counts - Deduplicated cross matches cross()")
+log("-" * 80)
+
+for count_female, count_male in [(cyoo_female, cyoo_male), (simple_female, simple_male), (het_female, homoz_male)]:
+    counts, total = cross_counts(count_female, count_male)
+    full_cross = cross(count_female, count_male)
+    log(f"Distinct offspring: {len(counts)}, total viable: {total}, cross(): {len(full_cross)}")
+    assert total == len(full_cross), "cross_counts total should equal len(cross())"
+    assert total == sum(counts.values()), "cross_counts total should equal the sum of its counts"
+    assert len(counts) == len({genotype_to_key(g) for g in full_cross}), "cross_counts should have one entry per distinct offspring"
+log("✓ Passed: cross_counts agrees with cross()\n")
+
+
+# ============================================================================
+# Tests for: cross_logic.get_unique_offspring_keys / key_to_genotype
+# ============================================================================
+log("[Test Suite 19] get_unique_offspring_keys - Keyed distribution matches get_unique_offspring")
+log("-" * 80)
+
+for keyed_female, keyed_male in [(cyoo_female, cyoo_male), (simple_female, simple_male), (het_female, homoz_male)]:
+    keyed_off = get_unique_offspring_keys(keyed_female, keyed_male)
+    dict_off = get_unique_offspring(keyed_female, keyed_male)
+    log(f"Unique offspring (keyed): {len(keyed_off)}, (dicts): {len(dict_off)}")
+    assert [(key_to_genotype(k), f) for k, f in keyed_off] == dict_off, "Keyed distribution should match get_unique_offspring"
+    assert all(genotype_to_key(key_to_genotype(k)) == k for k, _ in keyed_off), "key_to_genotype should round-trip"
+log("✓ Passed: Keyed offspring distribution matches\n")
+
+
+# ============================================================================
+# Tests for: cross_logic.is_lethal_key / has_homozygous_balancer_key
+# ============================================================================
+log("[Test Suite 20] is_lethal_key / has_homozygous_balancer_key - Agree with dict predicates")
+log("-" * 80)
+
+tm6_hom_genotype = {"2": ("+", "+"), "3": ("TM6", "TM6"), "4": ("+", "+")}
+for predicate_genotype in [lethal_genotype, fm7_genotype, viable_genotype, tm6_hom_genotype]:
+    predicate_key = genotype_to_key(predicate_genotype)
+    log(f"Genotype: {predicate_genotype} -> lethal {is_lethal_key(predicate_key)}, "
+        f"homozygous balancer {has_homozygous_balancer_key(predicate_key)}")
+    assert is_lethal_key(predicate_key) == is_lethal(predicate_genotype), "is_lethal_key should match is_lethal"
+    assert has_homozygous_balancer_key(predicate_key) == has_homozygous_balancer(predicate_genotype), \
+        "has_homozygous_balancer_key should match has_homozygous_balancer"
+log("✓ Passed: Key predicates agree with dict predicates\n")
+
+
 # ============================================================================
-print("\n" + "=" * 80)
-print("ALL TESTS PASSED!")
-print("=" * 80)
-print("\nTest coverage:")
-print("  ✓ Genotype parsing (internal/external conversion)")
-print("  ✓ Balancer detection")
-print("  ✓ Lethality rules (including FM7 non-lethal balancer)")
-print("  ✓ Gamete production (males and females)")
-print("  ✓ Balancer-suppressed recombination")
-print("  ✓ Cross logic with lethality filtering")
-print("  ✓ Frequency calculations")
-print("  ✓ Mendelian segregation")
-print("  ✓ Role-based female eligibility predicate")
+# Tests for: cross_logic.validate_stock_genotype (shape check)
+# ============================================================================
+log("[Test Suite 21] validate_stock_genotype - Malformed genotypes are rejected")
+log("-" * 80)
+
+for malformed in [{"2": ("CyO",)}, {"2": ("CyO", "+", "+")}, {"2": ["CyO", "+"]}]:
+    try:
+        validate_stock_genotype(malformed)
+    except ValueError as e:
+        log(f"{malformed}: {e}")
+    else:
+        raise AssertionError(f"validate_stock_genotype should reject {malformed}")
+validate_stock_genotype(viable_genotype)
+log("✓ Passed: Genotypes without 2-allele tuples raise ValueError\n")
+
+
+# ============================================================================
+# Tests for: target_planner.plan_to_target
+# ============================================================================
+log("[Test Suite 22] plan_to_target - Best route kept per intermediate genotype")
+log("-" * 80)
+
 
+def _planner_stock(name: str, genotype: str) -> dict:
+    return {"name": name, "genotype": genotype, "internal_genotype": external_to_internal(genotype)[0]}
+
+
+# Stocks from the shipped lab stocks.xlsx, inlined so the check does not depend on the workbook
+sp_mkrs = _planner_stock("B04:3", "2:Sp/CyO 3:MKRS,Sb/TM6,Tb 4:+/+")
+ecr_cyo = _planner_stock("N1", "2:UAS_EcR.DN/CyO 3:+/+ 4:+/+")
+qf2_ok107 = _planner_stock("G04:3", "2:71G10-QF2,QUAS-mtdT/CyO 3:+/+ 4:OK107-Gal4/OK107-Gal4")
+sp_gal4 = _planner_stock("G03:19", "2:Sp/CyO 3:71G10-Gal4attP2/TM6,Tb 4:+/+")
+sp_cyo_target = "2:Sp/CyO 3:+/+ 4:+/+"
+
+assert plan_to_target([sp_mkrs, ecr_cyo], sp_cyo_target, 1) is None, "Target is not reachable in one generation"
+two_gen = plan_to_target([sp_mkrs, ecr_cyo], sp_cyo_target, 2)
+log(f"B04:3 x N1: {two_gen and (two_gen.total_generations, two_gen.target_probability)}")
+assert two_gen is not None and two_gen.total_generations == 2, "B04:3 x N1 should reach the target in 2 generations"
+# The intermediate F1 male comes from the most probable brood: (1/6) * (1/6)
+assert abs(two_gen.target_probability - 1 / 36) < 1e-12, f"Expected probability 1/36, got {two_gen.target_probability}"
+assert canonical_genotype(two_gen.steps[-1].target_genotype) == canonical_genotype(external_to_internal(sp_cyo_target)[0])
+
+for pair in [(sp_mkrs, qf2_ok107), (sp_gal4, qf2_ok107)]:
+    three_gen = plan_to_target(list(pair), sp_cyo_target, 3)
+    log(f"{pair[0]['name']} x {pair[1]['name']}: {three_gen and (three_gen.total_generations, three_gen.target_probability)}")
+    assert three_gen is not None and three_gen.total_generations == 3, \
+        f"{pair[0]['name']} x {pair[1]['name']} should reach the target in 3 generations"
+log("✓ Passed: Planner finds the expected routes\n")
+
+
+# ============================================================================
+# Tests for: lab_stocks.append_stock_row
+# ============================================================================
+log("[Test Suite 23] append_stock_row - Appended rows read back through read_lab_stocks")
+log("-" * 80)
+
+shipped_workbook = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lab stocks.xlsx")
+with tempfile.TemporaryDirectory() as tmp_dir:
+    # Existing workbook: keys match the lowercase header case-insensitively, no new columns
+    workbook_copy = os.path.join(tmp_dir, "lab stocks.xlsx")
+    shutil.copy(shipped_workbook, workbook_copy)
+    stocks_before = read_lab_stocks(workbook_copy)
+    append_stock_row(workbook_copy, {
+        "Stock Owner": "tester", "STOCK NUMBER": "T-append", "Chromosome 2": "CyO/a",
+        "Chromosome 3": "+/+", "Chromosome 4": "+/+", "Notes": "appended",
+    })
+    stocks_after = read_lab_stocks(workbook_copy)
+    appended = get_stock_by_name(stocks_after, "t-append")
+    log(f"Stocks: {len(stocks_before)} -> {len(stocks_after)}, appended: {appended}")
+    assert len(stocks_after) == len(stocks_before) + 1, "Exactly one stock should be appended"
+    assert stocks_after[:-1] == stocks_before, "Existing stocks should be unchanged"
+    assert appended["internal_genotype"] == {"2": ("CyO", "a"), "3": ("+", "+"), "4": ("+", "+")}
+    assert appended["owner"] == "tester" and appended["notes"] == "appended"
+    assert list(pd.read_excel(workbook_copy).columns) == list(pd.read_excel(shipped_workbook).columns), \
+        "Case-insensitive header match should not add columns"
+
+    # Missing workbook: created with a header row from the row's keys
+    new_workbook = os.path.join(tmp_dir, "new stocks.xlsx")
+    append_stock_row(new_workbook, {
+        "stock owner": "lab", "stock number": "T-new", "chromosome 2": "+/+",
+        "chromosome 3": "TM3/b", "chromosome 4": "+/+", "notes": "",
+    })
+    new_stocks = read_lab_stocks(new_workbook)
+    log(f"New workbook stocks: {new_stocks}")
+    assert [s["name"] for s in new_stocks] == ["T-new"], "New workbook should hold just the appended stock"
+    assert new_stocks[0]["internal_genotype"]["3"] == ("TM3", "b")
+log("✓ Passed: Appended stocks read back correctly\n")
+
+
+# ============================================================================
+# Tests for: lab_stocks.LabStocks / get_stock_by_name
+# ============================================================================
+log("[Test Suite 24] get_stock_by_name - LabStocks name index follows list mutations")
+log("-" * 80)
+
+
+def _stock_lookup_fails(stocks, name: str) -> bool:
+    try:
+        get_stock_by_name(stocks, name)
+    except ValueError:
+        return True
+    return False
+
+
+indexed_stocks = LabStocks([{"name": "A"}, {"name": "B"}])
+assert get_stock_by_name(indexed_stocks, "b") is indexed_stocks[1]  # builds the index
+indexed_stocks[1] = {"name": "C"}
+assert get_stock_by_name(indexed_stocks, "c") is indexed_stocks[1], "Replaced stock should be found"
+assert _stock_lookup_fails(indexed_stocks, "b"), "Replaced stock should no longer be found"
+indexed_stocks.pop()
+indexed_stocks.append({"name": "D"})
+assert get_stock_by_name(indexed_stocks, "D") is indexed_stocks[1], "Stock appended after pop should be found"
+assert _stock_lookup_fails(indexed_stocks, "c"), "Popped stock should no longer be found"
+indexed_stocks.insert(0, {"name": "d"})
+assert get_stock_by_name(indexed_stocks, "D") is indexed_stocks[0], "First match wins, as in the list scan"
+del indexed_stocks[0]
+indexed_stocks += [{"name": "E"}]
+assert isinstance(indexed_stocks, LabStocks) and get_stock_by_name(indexed_stocks, "e")["name"] == "E"
+log(f"Stocks after mutations: {[s['name'] for s in indexed_stocks]}")
+log("✓ Passed: Name lookups stay correct after list mutations\n")
+
+
+# ============================================================================
+# Tests for: lab_stocks.read_lab_stocks (row parsing edge cases)
+# ============================================================================
+log("[Test Suite 25] read_lab_stocks - Blank, 'nan', whitespace and numeric cells")
+log("-" * 80)
+
+# Expected values are what the original row-by-row parser produced for these sheets:
+# stock numbers are str()'d, padded cells stripped, rows with no name skipped, a blank
+# owner reads as 'nan' but a whitespace-only one as '', blank/whitespace chromosomes dropped.
+chromosome_sheet = pd.DataFrame({
+    "Stock Number": ["S1", 5, None, " s4 ", "nan", "S6", 7.5, "S8", "S9"],
+    "Stock Owner": ["x", None, "y", " z ", "w", None, "v", 3, "   "],
+    "Chromosome 2": ["CyO/+", "+/+", "a/b", None, "c/d", " Sp / CyO ", "e", "nan", "TM3/+"],
+    "Chromosome 3": [None, "TM3/+", "+/+", None, "+", "+/+", None, None, "  "],
+    "Chromosome 4": ["+/+"] * 9,
+    "Notes": ["n1", None, "nan", " pad ", 5, None, "", "n8", "  "],
+})
+expected_chromosome_stocks = [
+    {'name': 'S1', 'genotype': '2:CyO/+ 4:+/+', 'owner': 'x', 'internal_genotype': {'2': ('CyO', '+'), '4': ('+', '+')}, 'notes': 'n1'},
+    {'name': '5', 'genotype': '2:+/+ 3:TM3/+ 4:+/+', 'owner': 'nan', 'internal_genotype': {'2': ('+', '+'), '3': ('TM3', '+'), '4': ('+', '+')}, 'notes': ''},
+    {'name': 's4', 'genotype': '4:+/+', 'owner': 'z', 'internal_genotype': {'4': ('+', '+')}, 'notes': 'pad'},
+    {'name': 'S6', 'genotype': '2:Sp/CyO 3:+/+ 4:+/+', 'owner': 'nan', 'internal_genotype': {'2': ('Sp', 'CyO'), '3': ('+', '+'), '4': ('+', '+')}, 'notes': ''},
+    {'name': '7.5', 'genotype': '2:e 4:+/+', 'owner': 'v', 'internal_genotype': {'2': ('e', 'e'), '4': ('+', '+')}, 'notes': ''},
+    {'name': 'S8', 'genotype': '4:+/+', 'owner': '3', 'internal_genotype': {'4': ('+', '+')}, 'notes': 'n8'},
+    {'name': 'S9', 'genotype': '2:TM3/+ 4:+/+', 'owner': '', 'internal_genotype': {'2': ('TM3', '+'), '4': ('+', '+')}, 'notes': ''},
+]
+genotype_sheet = pd.DataFrame({
+    "Name": ["A", 5, " C ", "D"],
+    "Genotype": ["2:CyO/+ 3:+/+", " 2:a/b ", "4:+/+", "3:TM3/+"],
+    "Sex": ["F", "M", None, "F"],
+    "Owner": ["o", None, " p ", 7],
+    "Notes": [None, "x", " ", "nan"],
+})
+expected_genotype_stocks = [
+    {'name': 'A', 'genotype': '2:CyO/+ 3:+/+', 'internal_genotype': {'2': ('CyO', '+'), '3': ('+', '+')}, 'owner': '', 'notes': ''},
+    {'name': '5', 'genotype': '2:a/b', 'internal_genotype': {'2': ('a', 'b')}, 'owner': '', 'notes': ''},
+    {'name': 'C', 'genotype': '4:+/+', 'internal_genotype': {'4': ('+', '+')}, 'owner': '', 'notes': ''},
+    {'name': 'D', 'genotype': '3:TM3/+', 'internal_genotype': {'3': ('TM3', '+')}, 'owner': '', 'notes': ''},
+]
+
+with tempfile.TemporaryDirectory() as tmp_dir:
+    for sheet, expected in [(chromosome_sheet, expected_chromosome_stocks), (genotype_sheet, expected_genotype_stocks)]:
+        sheet_path = os.path.join(tmp_dir, f"{sheet.columns[0]} stocks.xlsx")
+        sheet.to_excel(sheet_path, index=False)
+        parsed = read_lab_stocks(sheet_path)
+        log(f"{os.path.basename(sheet_path)}: {[s['name'] for s in parsed]}")
+        assert list(parsed) == expected, f"Parsed stocks changed for {os.path.basename(sheet_path)}: {list(parsed)}"
+        assert list(read_lab_stocks(sheet_path)) == expected, "Cached read should match the first parse"
+log("✓ Passed: Edge-case cells parse as before\n")
+
+
+# ============================================================================
+# Tests for: target_planner.plan_to_target (cancellation)
+# ============================================================================
+log("[Test Suite 26] plan_to_target - An already-set cancel_event stops the search")
+log("-" * 80)
+
+cancelled = threading.Event()
+cancelled.set()
+assert plan_to_target([sp_mkrs, ecr_cyo], sp_cyo_target, 2, cancel_event=cancelled) is None, \
+    "A set cancel_event should make plan_to_target return None"
+assert plan_to_target([sp_mkrs, ecr_cyo], sp_cyo_target, 2, cancel_event=threading.Event()) is not None, \
+    "An unset cancel_event should not change the result"
+log("✓ Passed: Cancelled search returns None\n")
+
+
+# ============================================================================
+# SUMMARY
+# ============================================================================
+log("\n" + "=" * 80)
+log("ALL TESTS PASSED!")
+log("=" * 80)
+log("\nTest coverage:")
+log("  ✓ Genotype parsing (internal/external conversion)")
+log("  ✓ Balancer detection")
+log("  ✓ Lethality rules (including FM7 non-lethal balancer)")
+log("  ✓ Gamete production (males and females)")
+log("  ✓ Balancer-suppressed recombination")
+log("  ✓ Cross logic with lethality filtering")
+log("  ✓ Frequency calculations")
+log("  ✓ Mendelian segregation")
+log("  ✓ Role-based female eligibility predicate")
+log("  ✓ cross_counts totals")
+log("  ✓ Keyed offspring distribution")
+log("  ✓ Key-based lethality / homozygous-balancer predicates")
+log("  ✓ Malformed genotype rejection")
+log("  ✓ Target planner routes")
+log("  ✓ Appending stock rows to the workbook")
+log("  ✓ Stock name index")
+log("  ✓ Workbook row parsing edge cases")
+log("  ✓ Planner cancellation")
+
+if QUIET:
+    print("ALL TESTS PASSED!")